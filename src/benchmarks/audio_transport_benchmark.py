@@ -0,0 +1,95 @@
+# Compares the shared memory audio ring buffer against an AioQueue for host audio going into a worker process.
+# Usage (from src/): python -m benchmarks.audio_transport_benchmark --frames 20000 --frame-size 4096
+# Throughput: frames are sent as fast as the transport takes them. Latency: frames are sent at the given interval,
+# the consumer compares the send time stamped into every frame with its own clock (monotonic is system wide on Linux).
+import asyncio
+import statistics
+import struct
+import time
+from argparse import ArgumentParser, Namespace
+from multiprocessing import Process, Queue
+
+from aioprocessing import AioQueue
+
+from room_system.audio_ring_buffer import AudioRingBuffer
+
+_TIMESTAMP = struct.Struct('<d')
+STOP_SIGNAL = b"__STOP__" # Same as room_worker's, which isn't imported to keep whisperlivekit out of the benchmark
+
+
+def get_args() -> Namespace:
+    cli = ArgumentParser(description="Benchmarks shared memory audio transport against aioprocessing queues")
+    cli.add_argument("--frames", type=int, default=20000, dest='frames', help="Frames sent in the throughput run")
+    cli.add_argument("--latency-frames", type=int, default=500, dest='latency_frames', help="Frames sent in the latency run")
+    cli.add_argument("--frame-size", type=int, nargs='+', default=[512, 4096, 32768], dest='frame_sizes', help="Frame sizes in bytes")
+    cli.add_argument("--interval", type=float, default=0.005, dest='interval', help="Seconds between frames in the latency run")
+    return cli.parse_args()
+
+def consumer(transport: str, source, results: Queue):
+    async def main():
+        if transport == 'ring':
+            source.start_reading()
+            get = source.get_chunk
+        else:
+            get = source.coro_get
+
+        latencies, total_bytes = [], 0
+        while True:
+            chunk = await get()
+            if chunk == STOP_SIGNAL:
+                break
+            latencies.append(time.monotonic() - _TIMESTAMP.unpack_from(chunk)[0])
+            total_bytes += len(chunk)
+        results.put((time.monotonic(), latencies, total_bytes))
+
+    asyncio.new_event_loop().run_until_complete(main())
+
+async def run(transport: str, frame_count: int, frame_size: int, interval: float) -> dict:
+    source = AudioRingBuffer() if transport == 'ring' else AioQueue()
+    results = Queue()
+    process = Process(target=consumer, args=(transport, source, results), daemon=True)
+    process.start()
+    await asyncio.sleep(0.5) # Let the consumer start waiting
+
+    if transport == 'ring':
+        send, send_stop = source.put, source.put_message
+    else:
+        send = send_stop = source.coro_put
+
+    padding = bytes(frame_size - _TIMESTAMP.size)
+    start = time.monotonic()
+    for _ in range(frame_count):
+        await send(_TIMESTAMP.pack(time.monotonic()) + padding)
+        if interval:
+            await asyncio.sleep(interval)
+    await send_stop(STOP_SIGNAL)
+
+    finished, latencies, total_bytes = await asyncio.get_running_loop().run_in_executor(None, results.get)
+    await asyncio.get_running_loop().run_in_executor(None, process.join, 10)
+    if transport == 'ring':
+        source.close()
+
+    elapsed = finished - start
+    latencies.sort()
+    return {
+        'frames_per_second': len(latencies) / elapsed,
+        'mb_per_second': total_bytes / elapsed / 1e6,
+        'p50_latency_us': statistics.median(latencies) * 1e6,
+        'p99_latency_us': latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    }
+
+async def main():
+    args = get_args()
+    for frame_size in args.frame_sizes:
+        for transport in ('queue', 'ring'):
+            throughput = await run(transport, args.frames, frame_size, 0)
+            latency = await run(transport, args.latency_frames, frame_size, args.interval)
+            print(
+                f"{transport:>5} {frame_size:>6}B: {throughput['frames_per_second']:>9.0f} frames/s "
+                f"{throughput['mb_per_second']:>8.1f} MB/s | paced latency p50={latency['p50_latency_us']:.0f}us "
+                f"p99={latency['p99_latency_us']:.0f}us",
+                flush=True
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+# Compares one whisper process per room against one shared multi-stream worker process, on CPU by default.
+# The shared worker runs the streams' model calls one after another (no batching), so this shows what sharing one model costs.
+# Usage (from src/): python -m benchmarks.multi_stream_benchmark --audio sample.webm --streams 4 --model tiny
+# Every stream gets the same audio file at real-time pace, like a host streaming from the browser.
+import asyncio
+import json
+import os
+import subprocess
+import time
+from argparse import ArgumentParser, Namespace
+from multiprocessing import Process
+
+from aioprocessing import AioQueue
+
+from room_system.audio_ring_buffer import AudioRingBuffer
+from room_system.room_worker import room_worker, pooled_room_worker, READY_SIGNAL, STOP_SIGNAL, LOADED_SIGNAL, \
+    SHUTDOWN_SIGNAL
+
+
+def get_args() -> Namespace:
+    cli = ArgumentParser(description="Benchmarks one-process-per-room against shared multi-stream whisper workers")
+    cli.add_argument("--audio", required=True, dest='audio', help="Audio file to stream, anything ffmpeg can decode")
+    cli.add_argument("--streams", type=int, nargs='+', default=[1, 2, 4], dest='streams', help="Numbers of concurrent rooms to benchmark")
+    cli.add_argument("--mode", default='both', choices=['both', 'process', 'shared'], dest='mode', help="Worker model(s) to benchmark")
+    cli.add_argument("--model", default='tiny', dest='model', help="Whisper model")
+    cli.add_argument("--device", default='cpu', dest='device', help="Compute device for whisper")
+    cli.add_argument("--compute-type", default='int8', dest='compute_type', help="Compute type for whisper")
+    cli.add_argument("-vac", "--voice-activity-controller", dest='vac', action="store_true", help="Enable voice activity controller")
+    cli.add_argument("-b", "--buffer-trimming", default='sentence', dest="buffer_trimming", help="Buffer trimming algorithm")
+    cli.add_argument("--min-chunk-size", type=float, default=1, dest="min_chunk_size", help="Minimum chunk size")
+    cli.add_argument("--vac-chunk-size", type=float, dest="vac_chunk_size", help="Vac chunk size")
+    cli.add_argument("--lang", default='en', dest='lang', help="Source language of the audio file")
+    cli.add_argument("--chunk-interval", type=float, default=0.25, dest='chunk_interval', help="Seconds of audio per sent chunk")
+    cli.add_argument("--max-lag", type=float, default=3, dest='max_lag', help="Transcription lag in seconds up to which a stream still keeps up")
+    cli.add_argument("--settle-timeout", type=float, default=30, dest='settle_timeout', help="Seconds to wait for the transcription to catch up after the audio ended")
+    cli.add_argument("--output", dest='output', help="Also write the results to this JSON file")
+    return cli.parse_args()
+
+def get_audio_duration(path: str) -> float:
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', path],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
+class Stream:
+    """Benchmark side of one room, feeds audio at real-time pace and tracks the transcription lag."""
+    def __init__(self, stream_id: int, audio: bytes, duration: float, chunk_interval: float):
+        self.stream_id = stream_id
+        self.ready = asyncio.Event()
+        self.lags: list[float] = []
+        self.last_transcript_at: float = None
+        self._audio = audio
+        self._duration = duration
+        self._chunk_interval = chunk_interval
+
+    def on_transcript(self, transcript):
+        if transcript == READY_SIGNAL:
+            self.ready.set()
+        elif isinstance(transcript, dict):
+            self.last_transcript_at = time.perf_counter()
+            self.lags.append(transcript.get('remaining_time_transcription', 0))
+
+    async def feed(self, send_chunk):
+        chunk_size = max(1, int(len(self._audio) / self._duration * self._chunk_interval))
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(self._audio), chunk_size)):
+            await send_chunk(self._audio[offset:offset + chunk_size])
+            await asyncio.sleep(max(0, start + (i + 1) * self._chunk_interval - time.perf_counter()))
+
+    async def settle(self, timeout: float):
+        """Waits until the transcription caught up with the fed audio, or stopped making progress."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.lags and self.lags[-1] <= 0.5:
+                return
+            await asyncio.sleep(0.1)
+
+
+async def run_process_mode(args: Namespace, audio: bytes, duration: float, stream_count: int) -> dict:
+    streams = [Stream(i, audio, duration, args.chunk_interval) for i in range(stream_count)]
+    workers = []
+    for stream in streams:
+        audio_ring, transcript_queue = AudioRingBuffer(), AioQueue()
+        process = Process(
+            target=room_worker,
+            args=(
+                f'bench-{stream.stream_id}', audio_ring, transcript_queue, args.lang, args.model, False, args.vac,
+                args.buffer_trimming, args.min_chunk_size, args.vac_chunk_size, args.device, args.compute_type
+            ),
+            daemon=True
+        )
+        process.start()
+        workers.append((stream, process, audio_ring, transcript_queue))
+
+    async def read_transcripts(stream: Stream, transcript_queue: AioQueue):
+        while True:
+            transcript = await transcript_queue.coro_get()
+            if transcript is None:
+                return
+            stream.on_transcript(transcript)
+
+    readers = [asyncio.create_task(read_transcripts(stream, queue)) for stream, _, _, queue in workers]
+    await asyncio.gather(*(stream.ready.wait() for stream in streams))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(stream.feed(audio_ring.put) for stream, _, audio_ring, _ in workers))
+    await asyncio.gather(*(stream.settle(args.settle_timeout) for stream in streams))
+    elapsed = time.perf_counter() - start
+
+    for _, process, audio_ring, transcript_queue in workers:
+        await audio_ring.put_message(STOP_SIGNAL)
+        await asyncio.get_running_loop().run_in_executor(None, process.join, 10)
+        if process.is_alive():
+            process.terminate()
+        audio_ring.close()
+        transcript_queue.put(None)
+    await asyncio.gather(*readers)
+    return summarize('process', streams, elapsed, duration, args.max_lag)
+
+async def run_shared_mode(args: Namespace, audio: bytes, duration: float, stream_count: int) -> dict:
+    streams = {i + 1: Stream(i + 1, audio, duration, args.chunk_interval) for i in range(stream_count)}
+    audio_ring, transcript_queue = AudioRingBuffer(), AioQueue()
+    loaded = asyncio.Event()
+    process = Process(
+        target=pooled_room_worker,
+        args=(
+            0, audio_ring, transcript_queue, args.lang, stream_count, args.model, False, args.vac,
+            args.buffer_trimming, args.min_chunk_size, args.vac_chunk_size, args.device, args.compute_type
+        ),
+        daemon=True
+    )
+    process.start()
+
+    async def read_transcripts():
+        while True:
+            stream_id, transcript = await transcript_queue.coro_get()
+            if transcript == SHUTDOWN_SIGNAL:
+                return
+            if transcript == LOADED_SIGNAL:
+                loaded.set()
+            elif stream_id in streams:
+                streams[stream_id].on_transcript(transcript)
+
+    reader = asyncio.create_task(read_transcripts())
+    await loaded.wait()
+    for stream_id in streams:
+        await audio_ring.put_message(('bind', stream_id, f'bench-{stream_id}', args.lang))
+    await asyncio.gather(*(stream.ready.wait() for stream in streams.values()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        stream.feed(lambda chunk, stream_id=stream_id: audio_ring.put(chunk, stream_id)) for stream_id, stream in streams.items()
+    ))
+    await asyncio.gather(*(stream.settle(args.settle_timeout) for stream in streams.values()))
+    elapsed = time.perf_counter() - start
+
+    await audio_ring.put_message(SHUTDOWN_SIGNAL)
+    await asyncio.get_running_loop().run_in_executor(None, process.join, 10)
+    if process.is_alive():
+        process.terminate()
+    audio_ring.close()
+    transcript_queue.put((None, SHUTDOWN_SIGNAL))
+    await reader
+    return summarize('shared', list(streams.values()), elapsed, duration, args.max_lag)
+
+def summarize(mode: str, streams: list[Stream], elapsed: float, duration: float, max_lag: float) -> dict:
+    lags = [lag for stream in streams for lag in stream.lags]
+    keeping_up = sum(1 for stream in streams if stream.lags and max(stream.lags) <= max_lag)
+    return {
+        'mode': mode,
+        'streams': len(streams),
+        'audio_seconds': duration,
+        'rtf': elapsed / duration, # Wall time until every stream caught up, 1.0 is real-time
+        'avg_lag': sum(lags) / len(lags) if lags else None,
+        'max_lag': max(lags) if lags else None,
+        'streams_keeping_up': keeping_up,
+        'rooms_per_core': keeping_up / os.cpu_count()
+    }
+
+async def main():
+    args = get_args()
+    with open(args.audio, 'rb') as audio_file:
+        audio = audio_file.read()
+    duration = get_audio_duration(args.audio)
+
+    modes = ['process', 'shared'] if args.mode == 'both' else [args.mode]
+    results = []
+    for stream_count in args.streams:
+        for mode in modes:
+            run = run_process_mode if mode == 'process' else run_shared_mode
+            result = await run(args, audio, duration, stream_count)
+            results.append(result)
+            print(
+                f"{mode:>7} x{stream_count}: rtf={result['rtf']:.2f} avg_lag={result['avg_lag']} max_lag={result['max_lag']} "
+                f"keeping_up={result['streams_keeping_up']}/{stream_count} rooms_per_core={result['rooms_per_core']:.2f}",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'cpu_count': os.cpu_count(), 'model': args.model, 'device': args.device, 'results': results}, output_file, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,16 @@
 import asyncio
+import time
 from types import CoroutineType
 from typing import Any, Awaitable, Callable
 import uuid
 from fastapi import WebSocket, WebSocketDisconnect
 from flask import json
 
+from io_config.config import CLIENT_QUEUE_SIZE, CLIENT_STALL_TIMEOUT
 from io_config.logger import LOGGER
+from rolling_average import RollingAverage
+from socket_sender import SocketSender, encode_json
+from transcription_system.transcription_helper import project_transcript
 from transcription_system.transcription_manager import TranscriptionManager
 from translation_worker import TranslationWorker
 
@@ -30,8 +35,18 @@ class ConnectionManager:
         self._host: WebSocket = None
         self.host_id: str = None
         self._clients: list[WebSocket] = []
+        self._senders: dict[WebSocket, SocketSender] = {} # Outbound queue per connected socket, including the host
+        self._dropped_count = 0
+        self._whisper_generator_handler_task: asyncio.Task = None
+        self._transcript_generator_handler_task: asyncio.Task = None
+        self.rolling_encode_time = RollingAverage(n=50)
+        self.rolling_fan_out_time = RollingAverage(n=50)
+        self._broadcast_count = 0
+        self._frame_bytes = 0 # Total size of all encoded frames, each frame is encoded once per update
+        self._group_count = 0 # Number of distinct payloads in the last broadcast
 
-    async def listen_to_host(self, host: WebSocket=None, target_lang: str=None):
+    async def listen_to_host(self, host: WebSocket=None, target_lang: str=None, delta_protocol: bool=False, last_seq: int=None,
+                             session: str=None):
         if not host:
             if not self._host:
                 LOGGER.error(f'Unable to listen to host in room <{self._room_id}>: Unknown host')
@@ -45,6 +60,7 @@ class ConnectionManager:
             # Establish new host connection
             self._host = host
             self.host_id = str(uuid.uuid4())
+            self._add_sender(host, 'host', target_lang, delta_protocol)
             await self._host.send_json({'info': {
                 'connection_id': self.host_id
             }})
@@ -59,7 +75,7 @@ class ConnectionManager:
             self._handle_transcript_generator(self.transcription_manager.transcript_generator())
         )
         
-        await self._host.send_json(self.transcription_manager.last_transcript_chunk) # Inital transcript chunk
+        self._send_initial_transcript(self._host, last_seq, session)
         LOGGER.info(f'Host connected in room <{self._room_id}>, listening...')
 
         try:
@@ -87,6 +103,7 @@ class ConnectionManager:
         except WebSocketDisconnect as error:
             LOGGER.info(f'Host disconnected in room <{self._room_id}>\n{error.code}: {error.reason}')
             self.cancel()
+            await self._remove_sender(self._host)
             self._host = None
             if target_lang:
                 self.translation_worker.unsubscribe_target_lang(target_lang)
@@ -97,18 +114,20 @@ class ConnectionManager:
         self.host_id = ''
         
     async def disconnect_all(self):
-        if self._host:
-            await self._host.close(code=1003, reason='Room closed')
-            self._host = None
-        
-        for client in self._clients:
-            await client.close(code=1003, reason='Room closed')
-        
+        # Close all sockets concurrently, so unresponsive ones don't delay the others
+        senders = list(self._senders.values())
+        self._senders = {}
+        self._host = None
         self._clients = []
+        await asyncio.gather(*(
+            sender.close(code=1003, reason='Room closed') for sender in senders
+        ))
         
-    async def connect_client(self, client: WebSocket, target_lang: str):
+    async def connect_client(self, client: WebSocket, target_lang: str, delta_protocol: bool=False, last_seq: int=None,
+                             session: str=None):
         self._clients.append(client)
-        await client.send_json(self.transcription_manager.last_transcript_chunk) # Inital transcript chunk
+        self._add_sender(client, f'client {len(self._clients)} in room <{self._room_id}>', target_lang, delta_protocol)
+        self._send_initial_transcript(client, last_seq, session)
         LOGGER.info(f'Client {len(self._clients)} connected to room <{self._room_id}>')
         self.translation_worker.subscribe_target_lang(target_lang)
 
@@ -118,6 +137,7 @@ class ConnectionManager:
         except (WebSocketDisconnect, RuntimeError):
             if client in self._clients:
                 self._clients.remove(client)
+            await self._remove_sender(client)
             self.translation_worker.unsubscribe_target_lang(target_lang)
             LOGGER.info(f'Client {len(self._clients) + 1} disconnected in room <{self._room_id}>')
     
@@ -136,6 +156,53 @@ class ConnectionManager:
             'ready_to_recieve_audio': True
         }})
     
+    def _add_sender(self, websocket: WebSocket, name: str, target_lang: str, delta_protocol: bool):
+        self._senders[websocket] = SocketSender(
+            websocket, name, target_lang, delta_protocol,
+            get_updates_since=self.get_updates_since,
+            on_closed=self._on_sender_closed,
+            max_queue_size=CLIENT_QUEUE_SIZE,
+            stall_timeout=CLIENT_STALL_TIMEOUT
+        )
+
+    async def _remove_sender(self, websocket: WebSocket):
+        sender = self._senders.pop(websocket, None)
+        if sender:
+            await sender.close()
+
+    def _on_sender_closed(self, sender: SocketSender):
+        # Socket died or stalled, the respective receive loop takes care of unsubscribing
+        if self._senders.get(sender.websocket) is not sender:
+            return
+        del self._senders[sender.websocket]
+        if sender.websocket in self._clients:
+            self._clients.remove(sender.websocket)
+            self._dropped_count += 1
+            LOGGER.info(f'Removed dead client in room <{self._room_id}>, {len(self._clients)} remaining')
+
+    def get_updates_since(self, last_seq: int=None, target_lang: str=None) -> list[dict]:
+        # Resolved on every call, the transcription manager gets replaced on engine restarts
+        return [
+            self._project(update, target_lang)
+            for update in self.transcription_manager.get_updates_since(last_seq)
+        ]
+
+    def _project(self, transcript: dict, target_lang: str) -> dict:
+        # Sockets only need the source text and their own target lang
+        return project_transcript(transcript, self.transcription_manager.source_lang, target_lang)
+
+    def _send_initial_transcript(self, websocket: WebSocket, last_seq: int=None, session: str=None):
+        sender = self._senders[websocket]
+        if session not in self.transcription_manager.known_session_ids:
+            last_seq = None # Seq of another session (e.g. before a server restart), start over with a snapshot
+        if sender.delta_protocol:
+            # Only send what the client missed since `last_seq`, or a full snapshot if it fell too far behind
+            sender.catch_up(last_seq)
+        else:
+            sender.send(encode_json(self._project( # Inital transcript chunk
+                self.transcription_manager.last_transcript_chunk, sender.target_lang
+            )))
+
     async def _handle_whisper_generator(self):
         while True:
             chunk = await self.transcript_chunk_provider()
@@ -143,21 +210,60 @@ class ConnectionManager:
                 self.transcript_chunk_recieved(chunk)
     
     async def _handle_transcript_generator(self, transcript_generator):
-        async for transcript in transcript_generator:
+        async for update in transcript_generator:
             LOGGER.info(f'Result for room <{self._room_id}>:')
-            LOGGER.info(transcript)
-            
-            await self._host.send_json(transcript) # Host also wants to recieve transcript
-            for client in self._clients:
-                try:
-                    await client.send_json(transcript)
-                except WebSocketDisconnect:
-                    LOGGER.info(f'Removing dead client {len(self._clients)} in room <{self._room_id}>')
-                    self._clients.remove(client)
+            LOGGER.info(update['delta'])
+            await self._broadcast(update)
         
         LOGGER.info(f'Results generator closed in room <{self._room_id}>')
         self._transcript_generator_handler_task.cancel() # TODO: check if this is necessary/working
 
+    async def _broadcast(self, update: dict):
+        """
+        Builds one projected payload per target lang and protocol, encodes each once
+        and hands the same frame to every socket of that group.
+        """
+        senders = list(self._senders.values())
+
+        encode_start = time.perf_counter()
+        snapshot = None # Full snapshot, only built if a legacy protocol socket is connected
+        frames: dict[tuple[str, bool], str] = {} # (target_lang, delta_protocol) -> frame for this update
+        for sender in senders:
+            group = (sender.target_lang, sender.delta_protocol)
+            if group in frames:
+                continue
+            if sender.delta_protocol:
+                transcript = update['delta']
+            else:
+                if snapshot is None:
+                    snapshot = self.transcription_manager.last_transcript_chunk
+                transcript = snapshot
+            frames[group] = encode_json(self._project(transcript, sender.target_lang))
+        fan_out_start = time.perf_counter()
+
+        for sender in senders:
+            sender.send(frames[(sender.target_lang, sender.delta_protocol)], update['seq'])
+
+        self.rolling_encode_time.add(fan_out_start - encode_start)
+        self.rolling_fan_out_time.add(time.perf_counter() - fan_out_start)
+        self._broadcast_count += 1
+        self._frame_bytes += sum(len(frame) for frame in frames.values())
+        self._group_count = len(frames)
+
+    def get_stats(self) -> dict:
+        return {
+            'clients': len(self._clients),
+            'host_connected': self._host is not None,
+            'broadcasts': self._broadcast_count,
+            'max_queue_size': max((sender.queue_size for sender in self._senders.values()), default=0),
+            'replaced_updates': sum(sender.replaced_count for sender in self._senders.values()),
+            'dropped_clients': self._dropped_count,
+            'payload_groups': self._group_count,
+            'avg_frame_bytes': self._frame_bytes / self._broadcast_count if self._broadcast_count else 0,
+            'avg_encode_ms': self.rolling_encode_time.get_average() * 1000,
+            'avg_fan_out_ms': self.rolling_fan_out_time.get_average() * 1000
+        }
+
     def cancel(self):
         if self._whisper_generator_handler_task:
             self._whisper_generator_handler_task.cancel()
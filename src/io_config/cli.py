@@ -19,6 +19,7 @@ def get_args() -> Namespace:
     cli.add_argument("--log-transcripts", dest='log_transcripts', action="store_true", help='Writes all ongoing transcriptions to human readable log files in /logs for debugging')
     cli.add_argument("-t", "--timeout", type=int, default=10, dest='timeout', help="Timeout in seconds for audio inactivity")
     cli.add_argument("--backlog-size", type=int, default=20, dest='backlog_size', help="Number of sentences to keep in the backlog")
+    cli.add_argument("--delta-history-size", type=int, default=200, dest='delta_history_size', help="Number of transcript deltas kept per room for resuming clients")
     # Show help if no argument specified
     if len(sys.argv) <= 1:
         sys.argv.append('--help')
@@ -38,6 +39,7 @@ MIN_CHUNK_SIZE: Final[float] = ARGS.min_chunk_size
 VAC_CHUNK_SIZE: Final[float] = ARGS.vac_chunk_size
 TIMEOUT: Final[int] = ARGS.timeout # TODO: were is this used? => Nowhere says PyCharm => Intention seems "Timeout in seconds for audio inactivity"
 BACKLOG_SIZE: Final[int] = ARGS.backlog_size
+DELTA_HISTORY_SIZE: Final[int] = ARGS.delta_history_size
 LOGLEVEL: Final[str] = ARGS.loglevel
 LOG_TRANSCRIPTS: Final[bool] = ARGS.log_transcripts
 
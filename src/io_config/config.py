@@ -30,16 +30,39 @@ FAKE_NOW: Final[datetime] = dateutil.parser.isoparse(CONFIG['pretalx']['fake_now
 # FastAPI-Section
 API_HOST: Final[str] = CONFIG['fastapi']['host']
 API_PORT: Final[int] = CONFIG['fastapi']['port']
+CLIENT_QUEUE_SIZE: Final[int] = CONFIG['fastapi']['client_queue_size']
+CLIENT_STALL_TIMEOUT: Final[float] = CONFIG['fastapi']['client_stall_timeout']
+PUSH_COALESCE_WINDOW: Final[float] = CONFIG['fastapi']['push_coalesce_window']
 
 # Whisper-Section
 AVAILABLE_WHISPER_LANGS: Final[str] = CONFIG['whisper']['langs']
 MAX_WHISPER_INSTANCES: Final[int] = CONFIG['whisper']['max_instances']
+WORKER_POOL_SIZE: Final[int] = CONFIG['whisper']['worker_pool_size']
+WORKER_STREAMS: Final[int] = CONFIG['whisper']['streams_per_worker']
+AUDIO_BUFFER_SIZE: Final[int] = CONFIG['whisper']['audio_buffer_size']
 CLOSE_ROOM_AFTER_SECONDS: Final[int] = CONFIG['whisper']['close_room_after_seconds']
 
 # LibreTranslate-Section
 LT_HOST: Final[str] = CONFIG['libretranslate']['host']
 LT_PORT: Final[int] = CONFIG['libretranslate']['port']
+LT_REPLICAS: Final[int] = CONFIG['libretranslate']['replicas']
+LT_HEALTH_INTERVAL: Final[float] = CONFIG['libretranslate']['health_interval']
+LT_RESTART_BACKOFF: Final[float] = CONFIG['libretranslate']['restart_backoff']
+LT_MAX_RESTART_BACKOFF: Final[float] = CONFIG['libretranslate']['max_restart_backoff']
 LT_LANGS: Final[str] = CONFIG['libretranslate']['langs']
+LT_POOL_SIZE: Final[int] = CONFIG['libretranslate']['pool_size']
+LT_TIMEOUT: Final[float] = CONFIG['libretranslate']['timeout']
+LT_RETRIES: Final[int] = CONFIG['libretranslate']['retries']
+LT_MAX_PARALLEL_LANGS: Final[int] = CONFIG['libretranslate']['max_parallel_langs']
+LT_MIN_CYCLE_INTERVAL: Final[float] = CONFIG['libretranslate']['min_cycle_interval']
+LT_MAX_IN_FLIGHT: Final[int] = CONFIG['libretranslate']['max_in_flight']
+LT_ROOM_QUEUE_SIZE: Final[int] = CONFIG['libretranslate']['room_queue_size']
+LT_SPECULATIVE_TRANSLATION: Final[bool] = CONFIG['libretranslate']['speculative_translation']
+LT_SPECULATIVE_DEBOUNCE: Final[float] = CONFIG['libretranslate']['speculative_debounce']
+LT_SPECULATIVE_MIN_CHANGE: Final[int] = CONFIG['libretranslate']['speculative_min_change']
+TRANSLATION_BACKEND_NAME: Final[str] = CONFIG['libretranslate']['backend']
+LT_LOCAL_DEVICE: Final[str] = CONFIG['libretranslate']['local_device']
+TRANSLATION_CACHE_SIZE: Final[int] = CONFIG['libretranslate']['cache_size']
 
 def get_available_languages():
     # Get Available Languages from libretranslate.com
@@ -53,3 +76,4 @@ AVAILABLE_LT_LANGS: Final[list[str]] = get_available_languages()
 # Data-Section
 TRANSCRIPT_DB_DIRECTORY: Final[str] = CONFIG['data']['transcript_db_directory']
 VOTES_DIR: Final[str] = CONFIG['data']['votes_directory']
+TRANSLATION_CACHE_DB: Final[str] = CONFIG['data']['translation_cache_db']
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Callable
+
+from io_config.logger import LOGGER
+
+_POSITIONS = struct.Struct('<QQ') # Total bytes written and read, only ever increase
+_FRAME_HEADER = struct.Struct('<IIB') # Payload length, stream id, kind
+_DATA_OFFSET = 64 # Keeps the positions on their own cache line
+_AUDIO = 0
+_MESSAGE = 1
+
+
+class AudioRingBuffer:
+    """
+    Single producer, single consumer transport for host audio from the server to a whisper worker process.
+    Audio frames are written straight into a shared memory ring, control messages (stop signals, language switches, ...)
+    get pickled into the same ring, so they stay in order with the audio around them.
+    A pipe wakes up the consumer's event loop, one byte per frame.
+    Created by the server before the worker process gets forked, which inherits the mapping and the pipe.
+    The audio is one continuous container stream that can't have holes, so writers wait for space while the ring is full.
+    Waiting is bounded by `write_timeout` seconds, only a worker that stopped reading fills minutes of audio.
+    """
+    def __init__(self, capacity: int=1 << 20, write_timeout: float=5):
+        self.capacity = capacity
+        self.write_timeout = write_timeout
+        self.dropped_frames = 0
+        self._shm = shared_memory.SharedMemory(create=True, size=_DATA_OFFSET + capacity)
+        self._buf = self._shm.buf
+        _POSITIONS.pack_into(self._buf, 0, 0, 0)
+        self._notify_r, self._notify_w = os.pipe()
+        os.set_blocking(self._notify_w, False)
+        self._write_lock: asyncio.Lock = None # Producer side, keeps waiting writers in order
+        self._readable: asyncio.Event = None # Consumer side
+
+    @property
+    def max_frame_size(self) -> int:
+        return self.capacity - _FRAME_HEADER.size
+
+    # ---- Producer ----
+    async def put(self, chunk: bytes, stream_id: int=0, is_alive: Callable[[], bool]=None) -> bool:
+        """
+        Writes an audio frame, waits while the ring is full.
+        Returns False if there still was no space after `write_timeout` seconds, or `is_alive` reports the consumer died.
+        """
+        if not (self._write_lock and self._write_lock.locked()) and self._try_write(_AUDIO, stream_id, chunk):
+            return True # Fast path, nobody is waiting for space
+        if not await self._put(_AUDIO, stream_id, chunk, is_alive):
+            self.dropped_frames += 1
+            return False
+        return True
+
+    async def put_message(self, message, is_alive: Callable[[], bool]=None) -> bool:
+        """Same as put, for control messages."""
+        return await self._put(_MESSAGE, 0, pickle.dumps(message), is_alive)
+
+    def send_message(self, message, is_alive: Callable[[], bool]=None):
+        """Writes a control message without blocking, it gets queued behind any writer waiting for space."""
+        payload = pickle.dumps(message)
+        if (self._write_lock and self._write_lock.locked()) or not self._try_write(_MESSAGE, 0, payload):
+            asyncio.create_task(self._send_later(message, payload, is_alive))
+
+    async def _send_later(self, message, payload: bytes, is_alive: Callable[[], bool]):
+        if not await self._put(_MESSAGE, 0, payload, is_alive):
+            LOGGER.warning(f'Dropped control message {message}, the audio ring buffer stayed full')
+
+    async def _put(self, kind: int, stream_id: int, payload: bytes, is_alive: Callable[[], bool]=None) -> bool:
+        if _FRAME_HEADER.size + len(payload) > self.capacity:
+            raise ValueError(f'Frame of {len(payload)} bytes exceeds the audio ring buffer capacity of {self.capacity} bytes')
+        if not self._write_lock:
+            self._write_lock = asyncio.Lock()
+        deadline = time.monotonic() + self.write_timeout
+        async with self._write_lock:
+            while self._buf is None or not self._try_write(kind, stream_id, payload):
+                if self._buf is None or time.monotonic() >= deadline or (is_alive and not is_alive()):
+                    return False # Closed, or the worker stopped reading
+                await asyncio.sleep(0.005)
+        return True
+
+    def _try_write(self, kind: int, stream_id: int, payload: bytes) -> bool:
+        written, read = _POSITIONS.unpack_from(self._buf, 0)
+        size = _FRAME_HEADER.size + len(payload)
+        if self.capacity - (written - read) < size:
+            return False
+        self._copy_in(written, _FRAME_HEADER.pack(len(payload), stream_id, kind))
+        self._copy_in(written + _FRAME_HEADER.size, payload)
+        struct.pack_into('<Q', self._buf, 0, written + size) # Publish the frame only once it is complete
+        try:
+            os.write(self._notify_w, b'\0')
+        except BlockingIOError:
+            pass # Pipe full, the consumer has plenty of wakeups pending already
+        return True
+
+    def _copy_in(self, position: int, data: bytes):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._buf[_DATA_OFFSET + start:_DATA_OFFSET + start + first] = data[:first]
+        if first < len(data):
+            self._buf[_DATA_OFFSET:_DATA_OFFSET + len(data) - first] = data[first:]
+
+    # ---- Consumer ----
+    def start_reading(self):
+        """Registers the wakeup pipe with the consumer's event loop, needs to be called from the worker process."""
+        self._readable = asyncio.Event()
+        os.set_blocking(self._notify_r, False)
+        asyncio.get_running_loop().add_reader(self._notify_r, self._on_notified)
+
+    def _on_notified(self):
+        try:
+            os.read(self._notify_r, 4096)
+        except BlockingIOError:
+            pass
+        self._readable.set()
+
+    async def get(self) -> tuple[int, object]:
+        """Returns the next (stream_id, audio chunk), or (0, message) for control messages."""
+        while True:
+            frame = self._try_read()
+            if frame is not None:
+                return frame
+            self._readable.clear()
+            frame = self._try_read() # A frame might have arrived before clearing
+            if frame is not None:
+                return frame
+            await self._readable.wait()
+
+    async def get_chunk(self) -> object:
+        """Same as get, without the stream id."""
+        return (await self.get())[1]
+
+    def _try_read(self):
+        written, read = _POSITIONS.unpack_from(self._buf, 0)
+        if written == read:
+            return None
+        length, stream_id, kind = _FRAME_HEADER.unpack(self._copy_out(read, _FRAME_HEADER.size))
+        payload = self._copy_out(read + _FRAME_HEADER.size, length)
+        struct.pack_into('<Q', self._buf, 8, read + _FRAME_HEADER.size + length) # Frees the frame for the producer
+        return stream_id, (pickle.loads(payload) if kind == _MESSAGE else payload)
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        # A single copy out of shared memory, the slot is handed back to the producer right after
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        data = bytes(self._buf[_DATA_OFFSET + start:_DATA_OFFSET + start + first])
+        if first < length:
+            data += bytes(self._buf[_DATA_OFFSET:_DATA_OFFSET + length - first])
+        return data
+
+    def get_stats(self) -> dict:
+        written, read = _POSITIONS.unpack_from(self._buf, 0)
+        return {
+            'capacity': self.capacity,
+            'used': written - read,
+            'bytes_written': written,
+            'dropped_frames': self.dropped_frames
+        }
+
+    # ---- Cleanup ----
+    def close(self, unlink: bool=True):
+        """Called by the server once the worker process exited, worker processes just exit."""
+        self._buf = None
+        self._shm.close()
+        if unlink:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        for fd in (self._notify_r, self._notify_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
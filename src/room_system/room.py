@@ -1,10 +1,13 @@
 import asyncio
-from typing import Callable
+import time
+from typing import Callable, Union
 
 from connection_manager import ConnectionManager
 from transcription_system.transcription_manager import TranscriptionManager
 from translation_worker import TranslationWorker
 from room_system.room_process import RoomProcess
+from room_system.worker_pool import WORKER_POOL, PooledRoomProcess
+from io_config.config import PUSH_COALESCE_WINDOW
 from io_config.logger import LOGGER
 
 class Room:
@@ -24,7 +27,8 @@ class Room:
         self.connection_manager: ConnectionManager = connection_manager
         self.translation_worker: TranslationWorker = translation_worker
         self._deactivation_task: asyncio.Task = None
-        self._room_process: RoomProcess = None
+        self._room_process: Union[RoomProcess, PooledRoomProcess] = None
+        self.push_window = PUSH_COALESCE_WINDOW # Can be tuned per room against viewer-perceived latency
     
     def get_data(self):
         host_connection_id = getattr(self.connection_manager, 'host_id', '') or ''
@@ -45,7 +49,14 @@ class Room:
             data['source_lang'] = self.transcription_manager.source_lang
         return data
     
-    async def activate(self, host_key: str, source_lang: str, target_langs: dict[str, int]={}, connection_manager: ConnectionManager=None, save_transcript: bool=False, public_transcript: bool=False, target_lang: str=None):
+    def get_stats(self) -> dict:
+        return {
+            'transcript': self.transcription_manager.get_stats(),
+            'connections': self.connection_manager.get_stats(),
+            'translation': self.translation_worker.get_stats()
+        }
+
+    async def activate(self, host_key: str, source_lang: str, target_langs: dict[str, int]=None, connection_manager: ConnectionManager=None, save_transcript: bool=False, public_transcript: bool=False, target_lang: str=None, initial_seq: int=0, previous_session_ids: frozenset=frozenset()):
         LOGGER.info(f'Activating room <{self.id}>')
         self.active = True
         if self._deactivation_task:
@@ -55,10 +66,15 @@ class Room:
         self.transcription_manager = TranscriptionManager(
             host_key, self.id, source_lang,
             save_transcript=save_transcript,
-            public_transcript=public_transcript
+            public_transcript=public_transcript,
+            initial_seq=initial_seq,
+            previous_session_ids=previous_session_ids,
+            push_window=self.push_window
         )
+        self.transcription_manager.start()
         
-        self._room_process = RoomProcess(self.id, source_lang)
+        # Prefer a warm worker with the model already loaded over spawning a new process
+        self._room_process = WORKER_POOL.create_room_process(self.id, source_lang)
         self.translation_worker = TranslationWorker(
             self.transcription_manager,
             target_langs=target_langs,
@@ -84,7 +100,12 @@ class Room:
             )
         
         # Start the room subprocess (needs connection manager to be initialized)
-        self._room_process.start(self.connection_manager.ready_to_recieve_audio)
+        started = time.perf_counter()
+        warm = isinstance(self._room_process, PooledRoomProcess)
+        async def on_ready():
+            WORKER_POOL.record_time_to_ready(warm, time.perf_counter() - started)
+            await self.connection_manager.ready_to_recieve_audio()
+        self._room_process.start(on_ready)
     
     async def deactivate(self, disconnect=True) -> bool:
         if not self.active:
@@ -102,6 +123,7 @@ class Room:
     async def cancel(self):
         self.connection_manager.cancel()
         self.translation_worker.stop()
+        await self.transcription_manager.stop()
         await self._room_process.stop()
 
     def defer_deactivation(self, on_deactivate: Callable[[None], None], deactivation_delay: float=300):
@@ -146,10 +168,28 @@ class Room:
             source_lang, target_langs,
             self.connection_manager, # Preserves ws connections across restart
             self.transcription_manager.save_transcript,
-            self.transcription_manager.public_transcript
+            self.transcription_manager.public_transcript,
+            initial_seq=self.transcription_manager.seq, # Keep delta protocol seq numbers monotonic
+            previous_session_ids=self.transcription_manager.known_session_ids # Resuming clients stay valid
         )
         return True
     
+    async def switch_source_lang(self, source_lang: str) -> bool:
+        """Switches the running engine to another source language, keeping the model, transcript and connections."""
+        if not self.active:
+            LOGGER.warning(f'Tried to switch the language of inactive room <{self.id}>')
+            return False
+
+        LOGGER.info(f'Switching room <{self.id}> to source language {source_lang}...')
+        requested = time.perf_counter()
+        def on_switched(switched_lang: str):
+            # Transcripts recieved before this point were still transcribed in the previous language
+            self.transcription_manager.switch_source_lang(switched_lang)
+            self.translation_worker.switch_source_lang(switched_lang)
+            LOGGER.info(f'Switched room <{self.id}> to {switched_lang} in {(time.perf_counter() - requested) * 1000:.0f}ms')
+        await self._room_process.switch_language(source_lang, on_switched)
+        return True
+    
     async def handle_host_signal(self, signal: str):
         LOGGER.info(f'Recieved signal in room <{self.id}>: {signal}')
         if signal == 'restart_backend_engine':
@@ -1,10 +1,11 @@
 from fastapi import WebSocket
 
-from io_config.config import AVAILABLE_WHISPER_LANGS, CLOSE_ROOM_AFTER_SECONDS, MAX_WHISPER_INSTANCES, \
-    AVAILABLE_LT_LANGS
+from io_config.config import AVAILABLE_WHISPER_LANGS, CLOSE_ROOM_AFTER_SECONDS, AVAILABLE_LT_LANGS
 from io_config.logger import LOGGER
 from pretalx_api_wrapper.conference import CONFERENCE
 from room_system.room import Room
+from room_system.worker_pool import WORKER_POOL
+from transcription_system.sentence_tokenizer import punkt_language_map
 
 
 class RoomManager:
@@ -35,7 +36,8 @@ class RoomManager:
             self.current_rooms.append(room)
         return True
     
-    async def activate_room_as_host(self, host: WebSocket, host_key: str, room_id:str, source_lang:str, target_lang: str, save_transcript: bool, public_transcript: bool):
+    async def activate_room_as_host(self, host: WebSocket, host_key: str, room_id:str, source_lang:str, target_lang: str, save_transcript: bool, public_transcript: bool,
+                                    delta_protocol: bool=False, last_seq: int=None, session: str=None):
         try:
             room = self.get_room(room_id)
         except RoomNotFoundError:
@@ -57,14 +59,21 @@ class RoomManager:
                 room.cancel_deactivation()
                 await room.connection_manager.ready_to_recieve_audio(host)
             else:
-                # Configuration mismatch, restart room
-                LOGGER.info(f'Host joined already active room <{room_id}> with mismatching configuration, restarting room...')
+                # Source language mismatch, switch the running engine over instead of reloading the model
+                if not source_lang in punkt_language_map:
+                    # Whisper knows more languages than the sentence tokenizer, the transcript couldn't be split anymore
+                    await host.close(code=1003, reason=f'Source language {source_lang} not supported by sentence tokenizer')
+                    return
+                LOGGER.info(f'Host joined already active room <{room_id}> with another source language, switching language...')
+                room.cancel_deactivation()
                 room.translation_worker.subscribe_target_lang(target_lang)
-                await room.restart_engine(source_lang)
+                await room.switch_source_lang(source_lang)
+                await room.connection_manager.ready_to_recieve_audio(host)
         else:
             # Initial room activation
-            if self._active_room_count >= MAX_WHISPER_INSTANCES:
-                await host.close(code=1003, reason=f'Unable to activate room <{room_id}>: Maximum capacity of {MAX_WHISPER_INSTANCES} instances reached')
+            # Rooms are limited by the whisper models that fit into memory, pooled workers may serve several rooms each
+            if not WORKER_POOL.has_capacity():
+                await host.close(code=1003, reason=f'Unable to activate room <{room_id}>: Maximum capacity of {WORKER_POOL.get_capacity()} rooms reached')
                 return
 
             self._active_room_count += 1
@@ -75,7 +84,7 @@ class RoomManager:
             )
 
         LOGGER.info(f'Attempting to start listening for host in room <{room_id}>...')
-        await room.connection_manager.listen_to_host(host, target_lang)
+        await room.connection_manager.listen_to_host(host, target_lang, delta_protocol, last_seq, session)
 
         # Host disconnected
         LOGGER.info(f'Host disconnected in room <{room_id}>, waiting a bit before closing room')
@@ -86,7 +95,8 @@ class RoomManager:
             on_deactivate, deactivation_delay=CLOSE_ROOM_AFTER_SECONDS
         )
 
-    async def join_room_as_client(self, client: WebSocket, room_id:str, target_lang:str):
+    async def join_room_as_client(self, client: WebSocket, room_id:str, target_lang:str, delta_protocol: bool=False, last_seq: int=None,
+                                  session: str=None):
         room = self.get_room(room_id)
         if not room:
             await client.close(code=1003, reason=f'Room <{room_id}> not found')
@@ -99,7 +109,7 @@ class RoomManager:
 
         LOGGER.info(f'Client joining room: {room_id}')
         try:
-            await room.connection_manager.connect_client(client, target_lang)
+            await room.connection_manager.connect_client(client, target_lang, delta_protocol, last_seq, session)
         except Exception as e:
             LOGGER.warning(f'Client connection failed:\n{e}')
             await client.close(code=1003, reason='Internal server error')
@@ -119,6 +129,9 @@ class RoomManager:
         await room.deactivate()
         return True
 
+    def get_stats(self) -> dict:
+        return {room.id: room.get_stats() for room in self.current_rooms if room.active}
+
     def get_room_list(self):
         rooms = []
         for room in self.current_rooms:
@@ -127,7 +140,7 @@ class RoomManager:
         return {
             'available_source_langs': AVAILABLE_WHISPER_LANGS,
             'available_target_langs': AVAILABLE_LT_LANGS,
-            'max_active_rooms': MAX_WHISPER_INSTANCES,
+            'max_active_rooms': WORKER_POOL.get_capacity(),
             'rooms': rooms
         }
 
@@ -2,22 +2,26 @@ import asyncio
 from multiprocessing import Process
 from typing import Awaitable, Callable
 from aioprocessing import AioQueue
+from io_config.config import AUDIO_BUFFER_SIZE
 from io_config.logger import LOGGER
-from room_system.room_worker import room_worker, READY_SIGNAL, STOP_SIGNAL
+from room_system.audio_ring_buffer import AudioRingBuffer
+from room_system.room_worker import room_worker, READY_SIGNAL, STOP_SIGNAL, SWITCH_LANGUAGE_SIGNAL, LANGUAGE_SWITCHED_SIGNAL
 
 from io_config.cli import MODEL, DEVICE, COMPUTE_TYPE, DIARIZATION, VAC, BUFFER_TRIMMING, MIN_CHUNK_SIZE, VAC_CHUNK_SIZE
 
 class RoomProcess:
-    def __init__(self, room_id: str, source_lang: str):
+    def __init__(self, room_id: str, source_lang: str, on_stopped: Callable[[], None]=None):
         self._room_id = room_id
-        self.audio_queue = AioQueue()
+        self._on_stopped = on_stopped # Lets the worker pool free the model budget of this process
+        self.audio_ring = AudioRingBuffer(AUDIO_BUFFER_SIZE)
         self.transcript_queue = AioQueue()
         self._on_ready: Callable[[None], Awaitable[None]] = None
+        self._on_language_switched: Callable[[str], None] = None
         
         self.process = Process(
             target=room_worker,
             args=(
-                room_id, self.audio_queue, self.transcript_queue, source_lang,
+                room_id, self.audio_ring, self.transcript_queue, source_lang,
                 MODEL, DIARIZATION, VAC, BUFFER_TRIMMING, # CLI args can't be acessed directly in other process
                 MIN_CHUNK_SIZE, VAC_CHUNK_SIZE, DEVICE, COMPUTE_TYPE
             ),
@@ -29,23 +33,43 @@ class RoomProcess:
         self.process.start()
 
     async def stop(self):
-        # Send the sentinel to the audio queue for graceful shutdown
-        await self.audio_queue.coro_put(STOP_SIGNAL)
+        # Send the sentinel behind the remaining audio for graceful shutdown
+        if not await self.audio_ring.put_message(STOP_SIGNAL, self.process.is_alive):
+            LOGGER.warning(f'Worker process for room <{self._room_id}> stopped reading audio, terminating it')
+            self.process.terminate()
        
         # Await process termination in a background thread
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(None, self.process.join, 10) # 10 second timeout
         if self.process.is_alive():
-            LOGGER.warning(f'Failed to stop worker process for room <{self._room_id}>')
+            LOGGER.warning(f'Failed to stop worker process for room <{self._room_id}>, terminating it')
+            self.process.terminate()
+        self.audio_ring.close()
+        if self._on_stopped:
+            self._on_stopped()
        
 
     async def send_audio_chunk(self, chunk: bytes):
-        await self.audio_queue.coro_put(chunk)
+        if len(chunk) > self.audio_ring.max_frame_size:
+            LOGGER.warning(f'Dropped audio chunk of {len(chunk)} bytes in room <{self._room_id}>, larger than the audio buffer')
+            return
+        if not await self.audio_ring.put(chunk, is_alive=self.process.is_alive):
+            LOGGER.error(f'Dropped audio chunk in room <{self._room_id}>, the worker process stopped reading audio')
+
+    async def switch_language(self, source_lang: str, on_switched: Callable[[str], None]=None):
+        """Switches the running engine to another source language, `on_switched` gets called once the worker applied it."""
+        self._on_language_switched = on_switched
+        # Audio sent before still uses the old language
+        if not await self.audio_ring.put_message((SWITCH_LANGUAGE_SIGNAL, source_lang), self.process.is_alive):
+            LOGGER.warning(f'Failed to switch the language of room <{self._room_id}>, the worker process stopped reading audio')
     
     async def get_transcript_chunk(self):
         chunk = await self.transcript_queue.coro_get()
         if chunk == READY_SIGNAL:
             if self._on_ready:
                 await self._on_ready()
+        elif isinstance(chunk, tuple) and chunk[0] == LANGUAGE_SWITCHED_SIGNAL:
+            if self._on_language_switched:
+                self._on_language_switched(chunk[1])
         else:
             return chunk
@@ -1,19 +1,23 @@
 import asyncio
+from typing import Awaitable, Callable
 from aioprocessing import AioQueue
 from whisperlivekit import TranscriptionEngine, AudioProcessor
 
 from io_config.logger import LOGGER
+from room_system.audio_ring_buffer import AudioRingBuffer
 
 READY_SIGNAL = b"__READY__"  # Sentinel value for signaling readiness of audio buffer
-STOP_SIGNAL = b"__STOP__"  # Sentinel value for graceful shutdown
+STOP_SIGNAL = b"__STOP__"  # Sentinel value for graceful shutdown, pooled workers only release their room
+LOADED_SIGNAL = b"__LOADED__"  # Sentinel value for signaling that a pooled worker finished loading its model
+SHUTDOWN_SIGNAL = b"__SHUTDOWN__"  # Sentinel value for shutting down a pooled worker
+SWITCH_LANGUAGE_SIGNAL = b"__SWITCH_LANGUAGE__"  # Sent as (signal, source_lang) to switch the language of a running session
+LANGUAGE_SWITCHED_SIGNAL = b"__LANGUAGE_SWITCHED__"  # Sent back as (signal, source_lang) once the switch is applied
+# Switching languages in place relies on WhisperLiveKit internals, pinned to this version in pyproject.toml
+WHISPERLIVEKIT_VERSION = '0.2.5'
 
-def room_worker(room_id: str, audio_queue: AioQueue, transcript_queue: AioQueue, source_lang,
-                model: str, diarization: bool, vac: bool, buffer_trimming: str,
-                min_chunk_size: int, vac_chunk_size: int, device: str, compute_type: str):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
-    LOGGER.info(f'Loading whisper model for {room_id}: {model}, diarization={diarization}, language={source_lang}')
+def load_engine(name: str, source_lang: str, model: str, diarization: bool, vac: bool, buffer_trimming: str,
+                min_chunk_size: int, vac_chunk_size: int, device: str, compute_type: str) -> TranscriptionEngine:
+    LOGGER.info(f'Loading whisper model for {name}: {model}, diarization={diarization}, language={source_lang}')
     engine = TranscriptionEngine(
         model=model,
         diarization=diarization,
@@ -25,34 +29,199 @@ def room_worker(room_id: str, audio_queue: AioQueue, transcript_queue: AioQueue,
         device=device,
         compute_type=compute_type
     )
+    check_engine_internals(engine) # Fail at startup instead of on the first bind or language switch
+    return engine
+
+def check_engine_internals(engine: TranscriptionEngine):
+    """Makes sure the engine has the internals that language switches rely on."""
+    if not hasattr(getattr(engine, 'args', None), 'lan'):
+        raise WhisperLiveKitIncompatibleError('TranscriptionEngine.args.lan not found')
+    if getattr(engine, 'asr', None) is not None and not hasattr(engine.asr, 'original_language'):
+        raise WhisperLiveKitIncompatibleError(f'{type(engine.asr).__name__}.original_language not found')
+    if not hasattr(engine, 'tokenizer'):
+        raise WhisperLiveKitIncompatibleError('TranscriptionEngine.tokenizer not found')
+    if engine.tokenizer is not None:
+        _import_create_tokenizer()
+
+def _import_create_tokenizer() -> Callable:
+    try:
+        from whisperlivekit.whisper_streaming_custom.whisper_online import create_tokenizer
+    except ImportError as e:
+        raise WhisperLiveKitIncompatibleError(f'whisper_online.create_tokenizer not importable: {e}') from e
+    return create_tokenizer
+
+def create_language_tokenizer(engine: TranscriptionEngine, source_lang: str):
+    if getattr(engine, 'tokenizer', None) is None:
+        return None # Only sentence based buffer trimming uses a language specific tokenizer
+    return _import_create_tokenizer()(source_lang)
+
+def set_engine_language(engine: TranscriptionEngine, source_lang: str):
+    """Points a loaded engine at another source language, whisper models are multilingual so nothing gets reloaded."""
+    check_engine_internals(engine)
+    engine.args.lan = source_lang
+    if getattr(engine, 'asr', None) is not None:
+        engine.asr.original_language = None if source_lang == 'auto' else source_lang
+    engine.tokenizer = create_language_tokenizer(engine, source_lang)
+
+def set_session_language(audio_processor: AudioProcessor, engine: TranscriptionEngine, source_lang: str):
+    """Switches a running session to another source language, keeping its audio buffer and transcript."""
+    set_engine_language(engine, source_lang) # The session's ASR is the engine's, so the next inference uses the new language
+    online = getattr(audio_processor, 'online', None)
+    online = getattr(online, 'online', online) # The voice activity controller wraps the actual processor
+    tokenizer_names = [name for name in ('tokenize', 'tokenizer') if getattr(online, name, None) is not None]
+    if engine.tokenizer is not None and not tokenizer_names:
+        # The session would silently keep splitting sentences in the previous language
+        raise WhisperLiveKitIncompatibleError('sentence tokenizer of the running session not found')
+    for name in tokenizer_names:
+        setattr(online, name, engine.tokenizer) # Copied from the engine when the session started
+
+async def run_session(room_id: str, engine: TranscriptionEngine, get_audio: Callable[[], Awaitable[object]],
+                      send_transcript: Callable[[object], Awaitable[None]]) -> bool:
+    """
+    Transcribes the audio of one room until the stop signal arrives.
+    Returns False if the worker was asked to shut down instead.
+    """
     audio_processor = AudioProcessor(transcription_engine=engine)
+    shutdown = False
 
     async def audio_feeder():
+        nonlocal shutdown
         while True:
-            chunk = await audio_queue.coro_get()
-            if chunk == STOP_SIGNAL:
+            chunk = await get_audio()
+            if chunk == STOP_SIGNAL or chunk == SHUTDOWN_SIGNAL:
                 LOGGER.info(f'Worker process for room <{room_id}> recieved termination signal, exiting...')
+                shutdown = chunk == SHUTDOWN_SIGNAL
                 break
+            if isinstance(chunk, tuple) and chunk[0] == SWITCH_LANGUAGE_SIGNAL:
+                LOGGER.info(f'Switching worker process for room <{room_id}> to language {chunk[1]}')
+                set_session_language(audio_processor, engine, chunk[1])
+                await send_transcript((LANGUAGE_SWITCHED_SIGNAL, chunk[1]))
+                continue
             await audio_processor.process_audio(chunk)
 
     async def whisper_feeder():
         whisper_generator = await audio_processor.create_tasks()
         async for transcript in whisper_generator:
-            await transcript_queue.coro_put(transcript)
-    
-    async def main():
-        af_task = asyncio.create_task(audio_feeder())
-        wf_task = asyncio.create_task(whisper_feeder())
-        LOGGER.info(f'Worker process for room <{room_id}> ready')
-        await transcript_queue.coro_put(READY_SIGNAL)
+            await send_transcript(transcript)
+
+    af_task = asyncio.create_task(audio_feeder())
+    wf_task = asyncio.create_task(whisper_feeder())
+    LOGGER.info(f'Worker process for room <{room_id}> ready')
+    await send_transcript(READY_SIGNAL)
+    try:
         await af_task  # Wait until audio_feeder finishes (stop sentinel received)
-        
-        # After audio feeder ends, cancel whisper feeder to stop transcription
+    finally:
+        # After audio feeder ends (or failed), cancel whisper feeder to stop transcription
         wf_task.cancel()
         try:
             await wf_task
         except asyncio.CancelledError:
             pass # TODO: do something here? Gets hit somethimes, propably not a problem
-        
+        if hasattr(audio_processor, 'cleanup'):
+            await audio_processor.cleanup() # Pooled workers outlive the session, don't leak its ffmpeg process
+    return not shutdown
+
+def room_worker(room_id: str, audio_ring: AudioRingBuffer, transcript_queue: AioQueue, source_lang,
+                model: str, diarization: bool, vac: bool, buffer_trimming: str,
+                min_chunk_size: int, vac_chunk_size: int, device: str, compute_type: str):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    engine = load_engine(
+        room_id, source_lang, model, diarization, vac, buffer_trimming,
+        min_chunk_size, vac_chunk_size, device, compute_type
+    )
+
+    async def main():
+        audio_ring.start_reading()
+        await run_session(room_id, engine, audio_ring.get_chunk, transcript_queue.coro_put)
+
     loop.run_until_complete(main())
     LOGGER.info(f'Worker process for room <{room_id}> stopped')
+
+def pooled_room_worker(worker_id: int, audio_ring: AudioRingBuffer, transcript_queue: AioQueue, source_lang, max_streams: int,
+                       model: str, diarization: bool, vac: bool, buffer_trimming: str,
+                       min_chunk_size: int, vac_chunk_size: int, device: str, compute_type: str):
+    """
+    Loads the model once, then serves up to `max_streams` rooms at a time, one after another if `max_streams` is 1.
+    The audio ring carries audio frames tagged with their stream id, and the control messages ('bind', stream_id, room_id, source_lang),
+    ('stop', stream_id) and ('lang', stream_id, source_lang) to switch the language of a bound room.
+    Transcripts are sent as (stream_id, transcript), so the pool can route them and drop late ones of a released room.
+    With several streams the model is shared through SharedASR, which runs their calls one at a time without batching,
+    everything else stays per stream.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    engine = load_engine(
+        f'pooled worker {worker_id}', source_lang, model, diarization, vac, buffer_trimming,
+        min_chunk_size, vac_chunk_size, device, compute_type
+    )
+    shared_asr = None
+    if max_streams > 1:
+        from room_system.shared_asr import SharedASR
+        shared_asr = SharedASR(engine.asr)
+
+    async def main():
+        streams: dict[int, asyncio.Queue] = {} # stream_id -> audio inbox of its session
+        sessions: set[asyncio.Task] = set() # Includes stopped sessions that are still cleaning up
+        audio_ring.start_reading()
+        await transcript_queue.coro_put((0, LOADED_SIGNAL))
+        while True:
+            stream_id, message = await audio_ring.get()
+            if stream_id:
+                inbox = streams.get(stream_id) # Audio of a released stream gets dropped
+                if inbox:
+                    inbox.put_nowait(message)
+                continue
+            if message == SHUTDOWN_SIGNAL:
+                break
+
+            if message[0] == 'lang':
+                inbox = streams.get(message[1])
+                if inbox:
+                    inbox.put_nowait((SWITCH_LANGUAGE_SIGNAL, message[2]))
+            elif message[0] == 'stop':
+                inbox = streams.pop(message[1], None)
+                if inbox:
+                    inbox.put_nowait(STOP_SIGNAL)
+            elif message[0] == 'bind':
+                _, stream_id, room_id, room_lang = message
+                if shared_asr:
+                    from room_system.shared_asr import StreamEngine
+                    stream_engine = StreamEngine(engine, shared_asr, room_lang, create_language_tokenizer(engine, room_lang))
+                else:
+                    # The engine itself serves one room at a time, let the previous one finish first
+                    await asyncio.gather(*sessions, return_exceptions=True)
+                    set_engine_language(engine, room_lang)
+                    stream_engine = engine
+
+                inbox = asyncio.Queue()
+                async def send_transcript(transcript, stream_id=stream_id):
+                    await transcript_queue.coro_put((stream_id, transcript))
+                def on_session_done(task: asyncio.Task, stream_id=stream_id, room_id=room_id, inbox=inbox):
+                    sessions.discard(task)
+                    if not task.cancelled() and task.exception():
+                        # Only this room is lost, the worker keeps serving the other streams
+                        LOGGER.error(f'Session of room <{room_id}> in pooled worker {worker_id} failed: {task.exception()!r}')
+                        if streams.get(stream_id) is inbox:
+                            del streams[stream_id] # Nobody reads its inbox anymore, further audio gets dropped
+                task = asyncio.create_task(run_session(room_id, stream_engine, inbox.get, send_transcript))
+                task.add_done_callback(on_session_done)
+                sessions.add(task)
+                streams[stream_id] = inbox
+
+        for inbox in streams.values():
+            inbox.put_nowait(SHUTDOWN_SIGNAL)
+        await asyncio.gather(*sessions, return_exceptions=True)
+
+    loop.run_until_complete(main())
+    LOGGER.info(f'Pooled worker process {worker_id} stopped')
+
+
+class WhisperLiveKitIncompatibleError(RuntimeError):
+    def __init__(self, detail: str):
+        super().__init__(
+            f'Installed WhisperLiveKit is incompatible with in-place language switches ({detail}), '
+            f'install version {WHISPERLIVEKIT_VERSION} as pinned in pyproject.toml'
+        )
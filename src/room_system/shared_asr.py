@@ -0,0 +1,86 @@
+import copy
+import queue
+import threading
+import time
+from typing import Any
+
+
+class SharedASR:
+    """
+    Lets the streams of a multi-stream worker share one loaded whisper model, without batching.
+    Every stream transcribes from its own thread (as in WhisperLiveKit), the calls are queued and run one after another
+    by a single inference thread, so streams never compete for the model. Sharing saves the memory and load time of
+    a model per room, not inference time: every stream still gets its own forward pass.
+    """
+    def __init__(self, asr: Any):
+        self.asr = asr
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        self._request_count = 0
+        self._busy_time = 0.0
+        self._wait_time = 0.0 # Time requests spent queued behind other streams
+        self._thread = threading.Thread(target=self._run, name='SharedASR', daemon=True)
+        self._thread.start()
+
+    def transcribe(self, language: str, audio, init_prompt: str=''):
+        request = {
+            'language': language, 'audio': audio, 'init_prompt': init_prompt,
+            'queued': time.perf_counter(), 'done': threading.Event()
+        }
+        self._requests.put(request)
+        request['done'].wait()
+        if 'error' in request:
+            raise request['error']
+        return request['result']
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            start = time.perf_counter()
+            self._wait_time += start - request['queued']
+            try:
+                self.asr.original_language = None if request['language'] == 'auto' else request['language']
+                request['result'] = self.asr.transcribe(request['audio'], init_prompt=request['init_prompt'])
+            except Exception as e:
+                request['error'] = e
+            self._busy_time += time.perf_counter() - start
+            self._request_count += 1
+            request['done'].set()
+
+    def get_stats(self) -> dict:
+        return {
+            'requests': self._request_count,
+            'busy_time': self._busy_time,
+            'avg_wait_ms': self._wait_time / self._request_count * 1000 if self._request_count else 0
+        }
+
+
+class StreamASR:
+    """Per-stream view of the shared model, transcribes in the stream's own language."""
+    def __init__(self, shared_asr: SharedASR, language: str):
+        self._shared_asr = shared_asr
+        self.original_language = None if language == 'auto' else language # Changed in place by a language switch
+
+    def transcribe(self, audio, init_prompt: str=''):
+        return self._shared_asr.transcribe(self.original_language or 'auto', audio, init_prompt)
+
+    def __getattr__(self, name: str):
+        # Everything else (word timestamps, separators, ...) is stateless and comes from the shared model
+        return getattr(self._shared_asr.asr, name)
+
+
+class StreamEngine:
+    """
+    Per-stream view of a TranscriptionEngine for AudioProcessor, with the stream's own ASR view, language settings,
+    sentence tokenizer and voice activity model, so no per-stream state is shared between rooms.
+    """
+    def __init__(self, engine: Any, shared_asr: SharedASR, language: str, tokenizer: Any):
+        self._engine = engine
+        self.asr = StreamASR(shared_asr, language)
+        self.tokenizer = tokenizer
+        self.args = copy.copy(engine.args)
+        self.args.lan = language
+        if getattr(engine, 'vac_model', None) is not None:
+            self.vac_model = copy.deepcopy(engine.vac_model) # The VAD model keeps its state between calls
+
+    def __getattr__(self, name: str):
+        return getattr(self._engine, name)
@@ -0,0 +1,262 @@
+import asyncio
+from multiprocessing import Process
+from typing import Awaitable, Callable, Optional, Union
+from aioprocessing import AioQueue
+
+from io_config.cli import MODEL, DEVICE, COMPUTE_TYPE, DIARIZATION, VAC, BUFFER_TRIMMING, MIN_CHUNK_SIZE, VAC_CHUNK_SIZE
+from io_config.config import WORKER_POOL_SIZE, WORKER_STREAMS, AUDIO_BUFFER_SIZE, MAX_WHISPER_INSTANCES
+from io_config.logger import LOGGER
+from rolling_average import RollingAverage
+from room_system.audio_ring_buffer import AudioRingBuffer
+from room_system.room_process import RoomProcess
+from room_system.room_worker import pooled_room_worker, READY_SIGNAL, LOADED_SIGNAL, SHUTDOWN_SIGNAL, LANGUAGE_SWITCHED_SIGNAL
+
+
+class PooledWorker:
+    """
+    Parent side of a pre-spawned whisper worker process, which keeps its model loaded between rooms.
+    Serves up to `max_streams` rooms at once, each bound room gets its own stream id.
+    """
+    def __init__(self, worker_id: int, max_streams: int=1, preload_lang: str='en'):
+        self.worker_id = worker_id
+        self.max_streams = max_streams
+        self.audio_ring = AudioRingBuffer(AUDIO_BUFFER_SIZE)
+        self.transcript_queue = AioQueue()
+        self.loaded = asyncio.Event()
+        self._next_stream_id = 1 # Never reused, transcripts of released streams are dropped
+        self._streams: dict[int, asyncio.Queue] = {} # stream_id -> transcripts of the bound room
+        self._reader_task: asyncio.Task = None
+
+        self.process = Process(
+            target=pooled_room_worker,
+            args=(
+                worker_id, self.audio_ring, self.transcript_queue, preload_lang, max_streams,
+                MODEL, DIARIZATION, VAC, BUFFER_TRIMMING, # CLI args can't be acessed directly in other process
+                MIN_CHUNK_SIZE, VAC_CHUNK_SIZE, DEVICE, COMPUTE_TYPE
+            ),
+            daemon=True
+        )
+
+    @property
+    def stream_count(self) -> int:
+        return len(self._streams)
+
+    @property
+    def free_slots(self) -> int:
+        return self.max_streams - len(self._streams)
+
+    def start(self):
+        self.process.start()
+        # A single long lived reader, a cancelled coro_get would otherwise swallow the next transcript in its thread
+        self._reader_task = asyncio.create_task(self._read_transcripts())
+
+    async def _read_transcripts(self):
+        while True:
+            stream_id, transcript = await self.transcript_queue.coro_get()
+            if transcript == SHUTDOWN_SIGNAL:
+                return
+            if transcript == LOADED_SIGNAL:
+                LOGGER.info(f'Pooled worker {self.worker_id} loaded its model')
+                self.loaded.set()
+            elif stream_id in self._streams:
+                self._streams[stream_id].put_nowait(transcript)
+
+    def bind(self, room_id: str, source_lang: str) -> tuple[int, asyncio.Queue]:
+        stream_id = self._next_stream_id
+        self._next_stream_id += 1
+        self._streams[stream_id] = asyncio.Queue()
+        self.audio_ring.send_message(('bind', stream_id, room_id, source_lang), self.process.is_alive)
+        return stream_id, self._streams[stream_id]
+
+    def release(self, stream_id: int):
+        if self._streams.pop(stream_id, None) is not None:
+            self.audio_ring.send_message(('stop', stream_id), self.process.is_alive) # Queued behind the room's remaining audio
+
+    async def send_audio_chunk(self, stream_id: int, chunk: bytes):
+        if len(chunk) > self.audio_ring.max_frame_size:
+            LOGGER.warning(f'Dropped audio chunk of {len(chunk)} bytes for stream {stream_id}, larger than the audio buffer')
+            return
+        if not await self.audio_ring.put(chunk, stream_id, self.process.is_alive):
+            LOGGER.error(f'Dropped audio chunk for stream {stream_id}, pooled worker {self.worker_id} stopped reading audio')
+
+    async def switch_language(self, stream_id: int, source_lang: str):
+        if not await self.audio_ring.put_message(('lang', stream_id, source_lang), self.process.is_alive):
+            LOGGER.warning(f'Failed to switch the language of stream {stream_id}, pooled worker {self.worker_id} stopped reading audio')
+
+    async def shutdown(self, timeout: float=10):
+        self.audio_ring.send_message(SHUTDOWN_SIGNAL, self.process.is_alive)
+        await asyncio.get_running_loop().run_in_executor(None, self.process.join, timeout)
+        if self.process.is_alive():
+            LOGGER.warning(f'Failed to stop pooled worker {self.worker_id}, terminating it')
+            self.process.terminate()
+        self.audio_ring.close()
+        if self._reader_task:
+            # Unblocks the reader thread, cancelling it would leave the thread waiting on the queue forever
+            self.transcript_queue.put((None, SHUTDOWN_SIGNAL))
+            await self._reader_task
+
+
+class PooledRoomProcess:
+    """Same interface as RoomProcess, backed by a warm worker checked out from the pool."""
+    def __init__(self, pool: 'WorkerPool', worker: PooledWorker, room_id: str, source_lang: str):
+        self._pool = pool
+        self._worker = worker
+        self._room_id = room_id
+        self._source_lang = source_lang
+        self._stream_id: int = None
+        self._transcripts: asyncio.Queue = None
+        self._on_ready: Callable[[None], Awaitable[None]] = None
+        self._on_language_switched: Callable[[str], None] = None
+        self._released = False
+
+    def start(self, on_ready: Callable[[None], Awaitable[None]]=None):
+        self._on_ready = on_ready
+        self._stream_id, self._transcripts = self._worker.bind(self._room_id, self._source_lang)
+        LOGGER.info(f'Bound pooled worker {self._worker.worker_id} to room <{self._room_id}>')
+
+    async def stop(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._worker, self._stream_id)
+
+    async def send_audio_chunk(self, chunk: bytes):
+        await self._worker.send_audio_chunk(self._stream_id, chunk)
+
+    async def switch_language(self, source_lang: str, on_switched: Callable[[str], None]=None):
+        self._on_language_switched = on_switched
+        await self._worker.switch_language(self._stream_id, source_lang)
+
+    async def get_transcript_chunk(self):
+        chunk = await self._transcripts.get()
+        if chunk == READY_SIGNAL:
+            if self._on_ready:
+                await self._on_ready()
+        elif isinstance(chunk, tuple) and chunk[0] == LANGUAGE_SWITCHED_SIGNAL:
+            if self._on_language_switched:
+                self._on_language_switched(chunk[1])
+        else:
+            return chunk
+
+
+class WorkerPool:
+    """
+    Pre-spawned whisper workers with their models already loaded, sized from config.yml.
+    Activating a room checks out a stream on the least loaded worker and binds it to the room's language,
+    releasing it frees the stream again. With more than one stream per worker, rooms share the worker's model.
+    Workers that are still loading get bound as well, the room becomes ready once the model is loaded.
+    Rooms only fall back to a freshly spawned RoomProcess if no worker has a free stream.
+    Every worker holds a model, so the pool counts against the `max_models` budget of whisper.max_instances,
+    whatever is left of it may be used by such cold processes. Rooms get admitted as long as either has room.
+    """
+    def __init__(self, size: int, streams_per_worker: int=1, max_models: int=None):
+        if streams_per_worker > 1 and DIARIZATION:
+            LOGGER.warning('Diarization keeps state in the shared model, serving a single stream per pooled worker')
+            streams_per_worker = 1
+        if max_models is not None and size > max_models:
+            LOGGER.warning(f'Worker pool of {size} exceeds the limit of {max_models} loaded models, only spawning {max_models}')
+            size = max_models
+        self._size = size
+        self._max_models = max_models if max_models is not None else size
+        self._cold_processes = 0
+        self._streams_per_worker = max(1, streams_per_worker)
+        self._workers: list[PooledWorker] = []
+        self._next_worker_id = 0
+        self._warm_starts = 0
+        self._cold_starts = 0
+        self.rolling_warm_ready = RollingAverage(n=20)
+        self.rolling_cold_ready = RollingAverage(n=20)
+
+    def start(self):
+        """Spawns the workers, needs to be called from the event loop."""
+        for _ in range(self._size):
+            self._spawn()
+
+    def _spawn(self):
+        worker = PooledWorker(self._next_worker_id, self._streams_per_worker)
+        self._next_worker_id += 1
+        worker.start()
+        self._workers.append(worker)
+
+    def _replace(self, worker: PooledWorker):
+        self._workers.remove(worker)
+        asyncio.create_task(worker.shutdown())
+        self._spawn()
+
+    def checkout(self, room_id: str, source_lang: str) -> Optional[PooledRoomProcess]:
+        for worker in list(self._workers):
+            if not worker.process.is_alive() and worker.stream_count == 0:
+                LOGGER.warning(f'Pooled worker {worker.worker_id} died, replacing it')
+                self._replace(worker)
+
+        available = [worker for worker in self._workers if worker.free_slots > 0 and worker.process.is_alive()]
+        if not available:
+            return None
+        # Loaded workers first, a loading one is still quicker than loading yet another model
+        worker = min(available, key=lambda worker: (not worker.loaded.is_set(), worker.stream_count))
+        return PooledRoomProcess(self, worker, room_id, source_lang)
+
+    def create_room_process(self, room_id: str, source_lang: str) -> Union[PooledRoomProcess, RoomProcess]:
+        """Prefers a stream of a pooled worker, spawns a cold process with its own model otherwise."""
+        room_process = self.checkout(room_id, source_lang)
+        if room_process:
+            return room_process
+        self._cold_processes += 1
+        return RoomProcess(room_id, source_lang, on_stopped=self._on_cold_process_stopped)
+
+    def _on_cold_process_stopped(self):
+        self._cold_processes = max(0, self._cold_processes - 1)
+
+    @property
+    def _cold_process_limit(self) -> int:
+        return max(0, self._max_models - len(self._workers))
+
+    def has_capacity(self) -> bool:
+        """Whether another room can be activated without exceeding the model budget."""
+        if any(worker.free_slots > 0 and worker.process.is_alive() for worker in self._workers):
+            return True
+        return self._cold_processes < self._cold_process_limit
+
+    def get_capacity(self) -> int:
+        """Number of rooms that can be active at the same time."""
+        return len(self._workers) * self._streams_per_worker + self._cold_process_limit
+
+    def release(self, worker: PooledWorker, stream_id: int):
+        worker.release(stream_id)
+        if not worker.process.is_alive() and worker.stream_count == 0 and worker in self._workers:
+            LOGGER.warning(f'Pooled worker {worker.worker_id} died while bound to a room, replacing it')
+            self._replace(worker)
+
+    def record_time_to_ready(self, warm: bool, seconds: float):
+        if warm:
+            self._warm_starts += 1
+            self.rolling_warm_ready.add(seconds)
+        else:
+            self._cold_starts += 1
+            self.rolling_cold_ready.add(seconds)
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        await asyncio.gather(*(worker.shutdown() for worker in workers))
+
+    def get_stats(self) -> dict:
+        loaded = [worker for worker in self._workers if worker.loaded.is_set()]
+        return {
+            'size': self._size,
+            'streams_per_worker': self._streams_per_worker,
+            'idle': sum(1 for worker in loaded if worker.stream_count == 0),
+            'loading': len(self._workers) - len(loaded),
+            'busy': sum(1 for worker in loaded if worker.stream_count > 0),
+            'streams': {worker.worker_id: worker.stream_count for worker in self._workers},
+            'free_streams': sum(worker.free_slots for worker in loaded),
+            'dropped_audio_frames': sum(worker.audio_ring.dropped_frames for worker in self._workers),
+            'cold_processes': self._cold_processes,
+            'max_models': self._max_models,
+            'room_capacity': self.get_capacity(),
+            'warm_starts': self._warm_starts,
+            'cold_starts': self._cold_starts,
+            'avg_warm_time_to_ready_ms': self.rolling_warm_ready.get_average() * 1000,
+            'avg_cold_time_to_ready_ms': self.rolling_cold_ready.get_average() * 1000
+        }
+
+# ---- INITIALIZE SINGLETON ----
+WORKER_POOL = WorkerPool(WORKER_POOL_SIZE, WORKER_STREAMS, MAX_WHISPER_INSTANCES)
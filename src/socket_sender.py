@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque
+from typing import Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+from flask import json
+
+from io_config.logger import LOGGER
+
+
+def encode_json(payload: dict) -> str:
+    # Same encoding as WebSocket.send_json, so frames can be encoded once and sent with send_text
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+class SocketSender:
+    """
+    Bounded outbound queue and sender task for a single websocket.
+    Every socket recieves transcript updates at its own pace, so one slow viewer doesn't hold up the rest of the room.
+    """
+    def __init__(self, websocket: WebSocket, name: str, target_lang: str, delta_protocol: bool,
+                 get_updates_since: Callable[[int, str], list[dict]], on_closed: Callable[['SocketSender'], None],
+                 max_queue_size: int=32, stall_timeout: float=10):
+        self.websocket = websocket
+        self.name = name
+        self.target_lang = target_lang
+        self.delta_protocol = delta_protocol
+        self.sent_seq: int = None # Seq of the last transcript update the socket actually recieved
+        self.replaced_count = 0 # Queued updates dropped in favour of a newer snapshot or catch-up
+        self.closed = False
+        self._get_updates_since = get_updates_since
+        self._on_closed = on_closed
+        self._max_queue_size = max_queue_size
+        self._stall_timeout = stall_timeout
+        self._queue: deque[tuple[int, str]] = deque() # (seq, frame), a frame of None requests a catch-up
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    def send(self, frame: str, seq: int=None):
+        """Queue an encoded transcript update, replacing stale ones if the socket fell behind."""
+        if self.closed:
+            return
+
+        if not self.delta_protocol:
+            # Every snapshot supersedes the previous ones, latest wins
+            self.replaced_count += len(self._queue)
+            self._queue.clear()
+        elif len(self._queue) >= self._max_queue_size:
+            # Deltas can't be skipped, collapse the backlog into a single catch-up from the last recieved seq instead
+            self.replaced_count += len(self._queue)
+            self._queue.clear()
+            frame = None
+
+        self._queue.append((seq, frame))
+        self._wakeup.set()
+
+    def catch_up(self, last_seq: int=None):
+        """Queue whatever the socket missed since `last_seq` (a full snapshot if that isn't available anymore)."""
+        self.sent_seq = last_seq
+        self._queue.append((None, None))
+        self._wakeup.set()
+
+    async def close(self, code: int=None, reason: str=None):
+        """Stops the sender task, also closes the websocket if a close code is given."""
+        self.closed = True
+        self._task.cancel()
+        if code is not None:
+            try:
+                await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self._stall_timeout)
+            except (asyncio.TimeoutError, RuntimeError, WebSocketDisconnect):
+                pass # Already closed or unresponsive, nothing more to do
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                seq, frame = self._queue.popleft()
+                if frame is None:
+                    for update in self._get_updates_since(self.sent_seq, self.target_lang):
+                        await self._send_frame(encode_json(update))
+                        self.sent_seq = update['seq']
+                    continue
+
+                if self.delta_protocol and seq is not None and self.sent_seq is not None and seq <= self.sent_seq:
+                    continue # Already covered by a catch-up
+                await self._send_frame(frame)
+                if seq is not None:
+                    self.sent_seq = seq
+        except asyncio.TimeoutError:
+            LOGGER.warning(f'Disconnecting {self.name}: Did not accept an update within {self._stall_timeout}s')
+            self.closed = True
+            self._on_closed(self)
+            asyncio.create_task(self.close(code=1008, reason='Connection too slow'))
+        except (WebSocketDisconnect, RuntimeError):
+            self.closed = True
+            self._on_closed(self)
+
+    async def _send_frame(self, frame: str):
+        await asyncio.wait_for(self.websocket.send_text(frame), self._stall_timeout)
@@ -1,3 +1,6 @@
+import time
+from collections import OrderedDict
+
 import nltk
 
 from io_config.logger import LOGGER
@@ -5,7 +8,7 @@ from io_config.logger import LOGGER
 LOGGER.info('Initializing nltk tokenizer for sentence splitting...')
 nltk.download('punkt')
 nltk.download('punkt_tab')
-from nltk.tokenize import sent_tokenize
+from nltk.tokenize import PunktTokenizer
 
 punkt_language_map = {
     'cs': 'czech',
@@ -26,4 +29,66 @@ punkt_language_map = {
     'es': 'spanish',
     'sv': 'swedish',
     'tr': 'turkish'
-}
\ No newline at end of file
+}
+
+
+class SentenceTokenizer:
+    """
+    Memoizes sentence splits per (lang, line text), as whisper resends mostly unchanged lines with every update.
+    Only accessed from the event loop, so no locking is needed.
+    """
+    def __init__(self, max_cache_size: int=4096):
+        self._tokenizers: dict[str, PunktTokenizer] = {}
+        self._cache: OrderedDict[tuple[str, str], tuple[str, ...]] = OrderedDict()
+        self._max_cache_size = max_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._miss_time = 0.0 # Total seconds spent tokenizing uncached lines
+
+    def preload(self, lang: str) -> PunktTokenizer:
+        """Load the punkt model for `lang` up front, so the first chunk of a room doesn't pay for it."""
+        tokenizer = self._tokenizers.get(lang)
+        if tokenizer:
+            return tokenizer
+
+        if not lang in punkt_language_map:
+            raise ValueError(f"NLTK sentence tokenizer not compatible with lang: {lang}")
+
+        LOGGER.info(f'Loading punkt tokenizer for {punkt_language_map[lang]}...')
+        tokenizer = PunktTokenizer(punkt_language_map[lang])
+        self._tokenizers[lang] = tokenizer
+        return tokenizer
+
+    def tokenize(self, text: str, lang: str) -> list[str]:
+        key = (lang, text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return list(cached)
+
+        self.misses += 1
+        start = time.perf_counter()
+        sentences = self.preload(lang).tokenize(text)
+        self._miss_time += time.perf_counter() - start
+
+        self._cache[key] = tuple(sentences)
+        if len(self._cache) > self._max_cache_size:
+            self._cache.popitem(last=False)
+        return sentences
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_miss_time = self._miss_time / self.misses if self.misses else 0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+            'cache_size': len(self._cache),
+            'loaded_langs': list(self._tokenizers.keys()),
+            'avg_miss_ms': avg_miss_time * 1000,
+            'estimated_saved_ms': self.hits * avg_miss_time * 1000
+        }
+
+# ---- INITIALIZE SINGLETON ----
+SENTENCE_TOKENIZER = SentenceTokenizer()
@@ -6,6 +6,12 @@ from typing import Any
 from io_config.config import TRANSCRIPT_DB_DIRECTORY
 from io_config.logger import LOGGER
 from pretalx_api_wrapper.conference import CONFERENCE, EventNotFoundError
+from transcription_system.transcript_store import load_transcript_log
+
+TRANSCRIPT_FILE_FORMATS = {
+    '.jsonl': '%Y-%m-%d_%H-%M-%S', # Append-only transcript logs
+    '.pkl': '%Y-%m-%d_%H-%M' # Legacy pickled lines
+}
 
 
 def format_time(seconds: int) -> str:
@@ -54,8 +60,11 @@ def get_transcript_from_file(transcript_db_path: str, lang: str) -> str:
     if not os.path.exists(transcript_db_path):
         raise FileNotFoundError(f'Unable to load transcript, invalid path: {transcript_db_path}')
     
-    with open(transcript_db_path, 'rb') as pkl_file:
-        lines = pickle.load(pkl_file)
+    if transcript_db_path.endswith('.jsonl'):
+        lines = load_transcript_log(transcript_db_path)
+    else:
+        with open(transcript_db_path, 'rb') as pkl_file:
+            lines = pickle.load(pkl_file)
     return get_transcript_from_lines(lines, lang)
 
 def get_transcript_from_lines(lines: list[dict[str, Any]], lang: str) -> str:
@@ -89,13 +98,13 @@ def get_transcript_from_lines(lines: list[dict[str, Any]], lang: str) -> str:
         return "\n".join(lines_output)
 
 def compile_transcript_from_dir(transcript_dir: str, lang: str) -> str:
-    # List .pkl files, extracting their timestamps
+    # List transcript files, extracting their timestamps
     files = []
     for filename in os.listdir(transcript_dir):
-        if filename.endswith('.pkl'):
+        timestamp_str, extension = os.path.splitext(filename)
+        if extension in TRANSCRIPT_FILE_FORMATS:
             try:
-                timestamp_str = filename.replace('.pkl', '')
-                dt = datetime.strptime(timestamp_str, '%Y-%m-%d_%H-%M')
+                dt = datetime.strptime(timestamp_str, TRANSCRIPT_FILE_FORMATS[extension])
                 files.append((dt, filename))
             except ValueError:
                 # Ignore files not matching expected pattern
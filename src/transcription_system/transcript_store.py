@@ -0,0 +1,133 @@
+import json
+import os
+import queue
+import threading
+from typing import Any
+
+from io_config.logger import LOGGER
+
+_STOP = object() # Sentinel value for stopping the writer thread
+
+
+class TranscriptStore:
+    """
+    Append-only log of transcript mutations for one transcription session, stored as JSON lines.
+    Records are written in batches by a dedicated background thread, so callers never block on disk I/O.
+    On close the log gets compacted into a single snapshot record.
+    """
+    def __init__(self, path: str, flush_interval: float=1.0, max_batch_size: int=256):
+        self.path = path
+        self._flush_interval = flush_interval
+        self._max_batch_size = max_batch_size
+        self._records = queue.SimpleQueue()
+        self._compact_on_close = True
+        self._writer = threading.Thread(target=self._write_loop, name=f'TranscriptStore-{os.path.basename(path)}', daemon=True)
+        self._writer.start()
+
+    def append_line(self, line: dict[str, Any]):
+        """Record a new or revised line, including all of its sentences."""
+        self._records.put({
+            'op': 'line',
+            'line_idx': line['line_idx'],
+            'beg': line['beg'],
+            'end': line['end'],
+            'speaker': line['speaker'],
+            'lang': line['lang'],
+            'text': line['text'],
+            'sentences': [
+                {'sent_idx': sentence['sent_idx'], 'content': dict(sentence['content'])}
+                for sentence in line['sentences']
+            ]
+        })
+
+    def append_translation(self, line_idx: int, sent_idx: int, lang: str, translation: str):
+        self._records.put({
+            'op': 'translation',
+            'line_idx': line_idx,
+            'sent_idx': sent_idx,
+            'lang': lang,
+            'translation': translation
+        })
+
+    def close(self, compact: bool=True):
+        """Flushes all pending records and stops the writer, compaction runs on the writer thread as well."""
+        self._compact_on_close = compact
+        self._records.put(_STOP)
+
+    def join(self, timeout: float=None):
+        self._writer.join(timeout)
+
+    def _write_loop(self):
+        stopped = False
+        with open(self.path, 'a', encoding='utf-8') as log_file:
+            while not stopped:
+                try:
+                    record = self._records.get(timeout=self._flush_interval)
+                except queue.Empty:
+                    continue
+
+                # Collect everything that is already queued into one batch
+                batch = []
+                while True:
+                    if record is _STOP:
+                        stopped = True
+                        break
+                    batch.append(json.dumps(record, ensure_ascii=False))
+                    if len(batch) >= self._max_batch_size:
+                        break
+                    try:
+                        record = self._records.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    try:
+                        log_file.write('\n'.join(batch) + '\n')
+                        log_file.flush()
+                    except OSError as e:
+                        LOGGER.error(f'Failed to write {len(batch)} transcript records to {self.path}: {e}')
+
+        if self._compact_on_close:
+            compact_transcript_log(self.path)
+
+
+def load_transcript_log(path: str) -> list[dict[str, Any]]:
+    """Replays a transcript log into a list of lines, in the same format as the legacy pickle files."""
+    lines: list[dict[str, Any]] = []
+    with open(path, 'r', encoding='utf-8') as log_file:
+        for raw_record in log_file:
+            try:
+                record = json.loads(raw_record)
+            except json.JSONDecodeError:
+                # Last record might be truncated if the server crashed mid-write
+                LOGGER.warning(f'Skipping corrupt record in transcript log {path}')
+                continue
+
+            op = record.get('op')
+            if op == 'snapshot':
+                lines = record['lines']
+            elif op == 'line':
+                line_idx = record['line_idx']
+                while len(lines) <= line_idx:
+                    lines.append({'line_idx': len(lines), 'beg': 0, 'end': 0, 'text': '', 'speaker': -1, 'sentences': []})
+                lines[line_idx] = {k: v for k, v in record.items() if k != 'op'}
+            elif op == 'translation':
+                try:
+                    sentence = lines[record['line_idx']]['sentences'][record['sent_idx']]
+                    sentence['content'][record['lang']] = record['translation']
+                except IndexError:
+                    LOGGER.warning(f'Skipping translation record for unknown sentence in transcript log {path}')
+
+    return lines
+
+def compact_transcript_log(path: str):
+    """Rewrites a transcript log as a single snapshot record."""
+    try:
+        lines = load_transcript_log(path)
+        compacted_path = f'{path}.compacting'
+        with open(compacted_path, 'w', encoding='utf-8') as compacted_file:
+            compacted_file.write(json.dumps({'op': 'snapshot', 'lines': lines}, ensure_ascii=False) + '\n')
+        os.replace(compacted_path, path) # Atomic, the original log stays intact if anything fails before
+        LOGGER.info(f'Compacted transcript log {path} ({len(lines)} lines)')
+    except OSError as e:
+        LOGGER.error(f'Failed to compact transcript log {path}: {e}')
@@ -1,3 +1,7 @@
+import re
+from difflib import SequenceMatcher
+from typing import Optional
+
 from io_config.logger import LOGGER
 
 
@@ -70,4 +74,89 @@ def get_last_n_sentences(lines: list, n: int, include_raw_string=False):
     # We collected lines in reverse order, reverse back for normal reading order
     result_lines.reverse()
         
-    return result_lines
\ No newline at end of file
+    return result_lines
+
+def normalize_for_alignment(sentence: str) -> str:
+    """Lowercase sentence without punctuation and redundant whitespace, so trivial edits compare equal."""
+    return ' '.join(re.sub(r'[^\w\s]', '', sentence.lower()).split())
+
+def align_sentences(old_sentences: list[str], new_sentences: list[str]) -> list[Optional[int]]:
+    """
+    Aligns two tokenizations of the same line by content instead of position.
+    Returns the index of the matching old sentence for every new sentence, None if it is new or was edited.
+    """
+    matcher = SequenceMatcher(
+        None,
+        [normalize_for_alignment(sentence) for sentence in old_sentences],
+        [normalize_for_alignment(sentence) for sentence in new_sentences],
+        autojunk=False
+    )
+    alignment: list[Optional[int]] = [None] * len(new_sentences)
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            alignment[new_start + offset] = old_start + offset
+    return alignment
+
+def merge_transcript_deltas(deltas: list[dict]) -> dict:
+    """
+    Merges consecutive transcript deltas into one, later changes to a line or sentence win.
+    The merged delta carries the seq of the last delta it contains.
+    """
+    merged_lines: dict[int, dict] = {}
+    for delta in deltas:
+        for line in delta['lines']:
+            merged_line = merged_lines.get(line['line_idx'])
+            if not merged_line:
+                merged_line = {**line, 'sentences': {}}
+                merged_lines[line['line_idx']] = merged_line
+            else:
+                merged_line.update({k: v for k, v in line.items() if k != 'sentences'})
+
+            for sentence in line['sentences']:
+                merged_line['sentences'][sentence['sent_idx']] = sentence
+
+    lines = []
+    for line_idx in sorted(merged_lines):
+        line = merged_lines[line_idx]
+        line['sentences'] = [
+            sentence for sent_idx, sentence in sorted(line['sentences'].items())
+            if sent_idx < line['sentence_count']
+        ]
+        lines.append(line)
+
+    merged = {k: v for k, v in deltas[-1].items() if k not in ('lines', 'reset')}
+    merged['lines'] = lines
+    if any(delta.get('reset') for delta in deltas):
+        merged['reset'] = True
+    return merged
+
+def project_transcript(transcript: dict, source_lang: str, target_lang: str) -> dict:
+    """
+    Returns a copy of a transcript chunk or delta where every sentence only contains the source and target lang.
+    Lines keep their own source lang, which differs from `source_lang` for lines transcribed before a language switch.
+    """
+    lines_key = 'lines' if 'lines' in transcript else 'last_n_sents'
+    projected = {
+        **transcript,
+        lines_key: [
+            {
+                **line,
+                'sentences': [
+                    {
+                        **sentence,
+                        'content': {
+                            lang: text for lang, text in sentence['content'].items()
+                            if lang in (line.get('lang', source_lang), target_lang)
+                        }
+                    }
+                    for sentence in line['sentences']
+                ]
+            }
+            for line in transcript[lines_key]
+        ]
+    }
+    if 'incomplete_sentence_translations' in transcript:
+        projected['incomplete_sentence_translations'] = {
+            lang: text for lang, text in transcript['incomplete_sentence_translations'].items() if lang in (source_lang, target_lang)
+        }
+    return projected
@@ -1,22 +1,26 @@
 import asyncio
 import os
-import pickle
-import threading
+import uuid
+from collections import OrderedDict, deque
 from datetime import datetime
+from itertools import islice
 
-from io_config.cli import LOG_TRANSCRIPTS, BACKLOG_SIZE
+from io_config.cli import LOG_TRANSCRIPTS, BACKLOG_SIZE, DELTA_HISTORY_SIZE
 from io_config.config import TRANSCRIPT_DB_DIRECTORY
 from io_config.logger import LOGGER
 from rolling_average import RollingAverage
-from transcription_system.transcription_helper import filter_complete_sentences, get_last_n_sentences, time_str_to_seconds
+from transcription_system.transcription_helper import align_sentences, filter_complete_sentences, get_last_n_sentences, \
+    merge_transcript_deltas, time_str_to_seconds
 from transcription_system.transcription_logger import log_transcript_to_file, log_to_translate
-from transcription_system.sentence_tokenizer import punkt_language_map, sent_tokenize
+from transcription_system.sentence_tokenizer import SENTENCE_TOKENIZER, punkt_language_map
+from transcription_system.transcript_store import TranscriptStore
 
 
 
 class TranscriptionManager:
     def __init__(self, host_key: str, room_id: str, source_lang: str, log_directory="logs", compare_depth=10,
-                 save_transcript: bool=False, public_transcript: bool=False):
+                 save_transcript: bool=False, public_transcript: bool=False, max_pending_translations: int=BACKLOG_SIZE,
+                 initial_seq: int=0, push_window: float=0.15, previous_session_ids: frozenset=frozenset()):
         
         self.save_transcript = save_transcript
         self.public_transcript = public_transcript
@@ -40,140 +44,297 @@ class TranscriptionManager:
         else:
             self._room_directory: str = None
 
-        self._open_time = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        self._open_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if save_transcript:
+            self._store = TranscriptStore(os.path.join(self._room_directory, f'{self._open_time}.jsonl'))
+        else:
+            self._store: TranscriptStore = None
         self.log_directory = log_directory
         self.host_key = host_key
         self.room_id = room_id
         self.log_path = f'{log_directory}/to_translate_{self.room_id}.txt'
         self.compare_depth = compare_depth
         self.source_lang = source_lang
-        self._punkt_lang = punkt_language_map.get(source_lang)
-        self.last_transcript_chunk = {
-            'last_n_sents': [],
-            'incomplete_sentence': '',
-            'transcription_delay': 0,
-            'translation_delay': 0
-        }
+        self._source_lang_line_idx = 0 # First line transcribed in the current source lang, the one in progress at the switch
+        SENTENCE_TOKENIZER.preload(source_lang)
+        self._last_transcript_chunk = None
+        self._last_transcript_chunk_seq = -1
         self._queue = asyncio.Queue()
 
+        # Delta protocol state, seq numbers continue across engine restarts so resuming clients stay monotonic
+        self.session_id = str(uuid.uuid4())
+        # Sessions of this room before engine restarts, their seq numbers continue in this one
+        self.known_session_ids = previous_session_ids | {self.session_id}
+        self._initial_seq = initial_seq
+        self.seq = initial_seq
+        self._dirty_lines: dict[int, set[int]] = {} # line_idx -> sent_idxs changed since the last push
+        self._delta_history: deque[dict] = deque(maxlen=DELTA_HISTORY_SIZE)
+
         self.rolling_transcription_delay = RollingAverage(n=4)
         self.rolling_translation_delay = RollingAverage(n=4)
 
         self._buffer_transcription = "" # Any text currently in the transcription buffer
         self._incomplete_sentence = "" # Any sentence that is out of the buffer but not completed
-        self._lines = []  # Each: {'beg', 'end', 'text', 'speaker', 'sentences': [ ... ]}
-        self._to_translate = []  # Each: {'line_idx', 'sent_idx', 'sentence', 'translated_langs': set()}
+        self._incomplete_sentence_translations: dict[str, str] = {} # Speculative previews, lang -> translation
+        self._preview_source = "" # Incomplete sentence the previews were translated from
+        self.incomplete_sentence_event = asyncio.Event() # Set whenever the incomplete sentence changes
+        self._lines = []  # Each: {'beg', 'end', 'text', 'speaker', 'lang', 'sentences': [ ... ]}
+        # Outstanding translation work keyed by (line_idx, sent_idx), ordered from oldest to most recently queued.
+        # Each: {'line_idx', 'sent_idx', 'sentence', 'translated_langs': set()}
+        self._to_translate: OrderedDict[tuple[int, int], dict] = OrderedDict()
+        self._max_pending_translations = max_pending_translations
+        self.target_langs: dict[str, int] = {} # Shared with the translation worker, which manages subscriptions
+        self._pending_snapshot: tuple[dict, ...] = () # Copy of outstanding work, most recent first, read by other threads
+        self._pending_changed = False
+        self._retranslations_saved = 0 # Translations carried over to moved or trivially edited sentences
+        self.pending_event = asyncio.Event() # Set whenever new or changed sentences are waiting for translation
 
-        self.lock = threading.Lock()
+        # All transcript state is owned by a single writer task on the event loop,
+        # chunks and translations reach it as messages through the inbox
+        self._inbox = asyncio.Queue()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._writer_task: asyncio.Task = None
 
-    
+        # State changes within `push_window` seconds get coalesced into one broadcast
+        self.push_window = push_window
+        self._push_handle: asyncio.TimerHandle = None
+        self._push_urgent = False
+        self._pushes_requested = 0
+        self._pushes_sent = 0
+
+    def start(self):
+        """Starts the writer task, needs to be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    async def stop(self):
+        """Lets the writer finish all queued messages, then flushes the transcript store."""
+        if self._writer_task:
+            self._submit(None)
+            await self._writer_task
+            self._writer_task = None
+        if self._push_handle:
+            self._flush_push() # Don't lose changes still waiting in the coalescing window
+        if self._store:
+            self._store.close(compact=True) # Compaction happens in the background
 
     def submit_chunk(self, chunk):
-        with self.lock:
-            # updated = self._buffer_transcription != chunk.get('buffer_transcription', '')
-            updated = False # Don't update on buffer updates
-            self._buffer_transcription = chunk.get('buffer_transcription', '')
-            incoming_lines = chunk.get('lines', [])
-            self.rolling_transcription_delay.add(chunk['remaining_time_transcription'])
-
-            for i, line in enumerate(incoming_lines):
-                beg = time_str_to_seconds(line['beg'])
-                end = time_str_to_seconds(line['end'])
-                text = line.get('text', '').strip()
-                speaker = line.get('speaker', None)
-                if text == '': continue
-
-                # Split into sentences
-                new_sentences_raw = sent_tokenize(text, language=self._punkt_lang)
-                new_sentences_raw, incomplete_sentence = filter_complete_sentences(new_sentences_raw)
-                if i == len(incoming_lines) - 1 and incomplete_sentence != self._incomplete_sentence:
-                    self._incomplete_sentence = incomplete_sentence
-                    updated = True
-
-                # TODO: Move parsing logic into sepeperate function
-                line_idx = len(self._lines) - len(incoming_lines) + i
-                if 0 <= line_idx < len(self._lines):
-                    if line_idx >= len(self._lines) - self.compare_depth:
-                        if text != self._lines[line_idx]['text']:
-                            # Line has changed, compare old and new sentences
-                            old_sentences = self._lines[line_idx]['sentences']
-
-                            # Prepare new sentences list
-                            new_sentences = []
-                            min_len = min(len(old_sentences), len(new_sentences_raw))
-                            # Step 1: Update unchanged sentences, reset changed ones
-                            for j in range(min_len):
-                                old_sentence_obj = old_sentences[j]
-                                new_sentence_text = new_sentences_raw[j]
-                                if old_sentence_obj['content'][self.source_lang] == new_sentence_text:
-                                    # Sentence unchanged: keep all translations
-                                    new_sentences.append(old_sentence_obj)
-                                else:
-                                    # Sentence changed: reset translations
-                                    new_sentences.append({
-                                        'sent_idx': len(new_sentences),
-                                        'content': {
-                                            self.source_lang: new_sentence_text
-                                        }
-                                    })
-                            # Step 2: Handle added sentences
-                            for j in range(min_len, len(new_sentences_raw)):
+        self._submit(('chunk', chunk))
+
+    def submit_translation(self, translation_results, translation_time):
+        """Thread safe, called by the translation worker."""
+        self._submit(('translation', translation_results, translation_time))
+
+    def submit_incomplete_sentence_translations(self, source_text: str, translations: dict[str, str]):
+        """Speculative translations of the incomplete sentence as it was when the translation started."""
+        self._submit(('preview', source_text, translations))
+
+    def requeue_recent_sentences(self, max_backlog: int):
+        """Queue the last `max_backlog` sentences again, e.g. after a new target lang was subscribed to."""
+        self._submit(('requeue', max_backlog))
+
+    def drop_pending_translations(self, keys: list[tuple[int, int]]):
+        """Remove stale (line_idx, sent_idx) entries from the translation queue."""
+        self._submit(('drop', keys))
+
+    def switch_source_lang(self, source_lang: str):
+        """
+        Continues the transcript in another source language, chunks submitted afterwards are tokenized in it.
+        Sentences from before the switch keep their content under the previous source language.
+        """
+        if not source_lang in punkt_language_map:
+            raise ValueError(f"NLTK sentence tokenizer not compatible with source_lang: {punkt_language_map}.")
+        SENTENCE_TOKENIZER.preload(source_lang)
+        self._submit(('source_lang', source_lang))
+
+    def _submit(self, message):
+        # call_soon_threadsafe keeps messages from the event loop and other threads in one deterministic order
+        self._loop.call_soon_threadsafe(self._inbox.put_nowait, message)
+
+    async def _run_writer(self):
+        while True:
+            message = await self._inbox.get()
+            if message is None:
+                break
+
+            try:
+                if message[0] == 'chunk':
+                    self._apply_chunk(message[1])
+                elif message[0] == 'translation':
+                    self._apply_translation(message[1], message[2])
+                elif message[0] == 'requeue':
+                    self._apply_requeue(message[1])
+                elif message[0] == 'drop':
+                    self._apply_drop(message[1])
+                elif message[0] == 'preview':
+                    self._apply_preview(message[1], message[2])
+                elif message[0] == 'source_lang':
+                    self._apply_source_lang(message[1])
+            except Exception:
+                LOGGER.exception(f'Failed to apply {message[0]} message in room <{self.room_id}>')
+
+            if self._pending_changed:
+                self._publish_pending()
+            if self._push_urgent:
+                self._flush_push()
+
+        LOGGER.info(f'Transcript writer for room <{self.room_id}> stopped')
+
+    def _apply_chunk(self, chunk):
+        # updated = self._buffer_transcription != chunk.get('buffer_transcription', '')
+        updated = False # Don't update on buffer updates
+        sentence_completed = False
+        self._buffer_transcription = chunk.get('buffer_transcription', '')
+        incoming_lines = chunk.get('lines', [])
+        self.rolling_transcription_delay.add(chunk['remaining_time_transcription'])
+        hits, misses = SENTENCE_TOKENIZER.hits, SENTENCE_TOKENIZER.misses
+
+        for i, line in enumerate(incoming_lines):
+            beg = time_str_to_seconds(line['beg'])
+            end = time_str_to_seconds(line['end'])
+            text = line.get('text', '').strip()
+            speaker = line.get('speaker', None)
+            if text == '': continue
+
+            line_idx = len(self._lines) - len(incoming_lines) + i
+            # Lines finished before a switch keep their source language, the line in progress continues in the new one
+            line_lang = self._lines[line_idx]['lang'] if 0 <= line_idx < self._source_lang_line_idx else self.source_lang
+
+            # Split into sentences
+            new_sentences_raw = SENTENCE_TOKENIZER.tokenize(text, line_lang)
+            new_sentences_raw, incomplete_sentence = filter_complete_sentences(new_sentences_raw)
+            if i == len(incoming_lines) - 1 and incomplete_sentence != self._incomplete_sentence:
+                self._incomplete_sentence = incomplete_sentence
+                self.incomplete_sentence_event.set()
+                updated = True
+
+            # TODO: Move parsing logic into sepeperate function
+            if 0 <= line_idx < len(self._lines):
+                if line_idx >= len(self._lines) - self.compare_depth:
+                    if text != self._lines[line_idx]['text']:
+                        # Line has changed, compare old and new sentences
+                        old_sentences = self._lines[line_idx]['sentences']
+
+                        # Prepare new sentences list, aligned by content so moved or trivially edited sentences keep their translations
+                        new_sentences = []
+                        alignment = align_sentences(
+                            [sentence['content'].get(line_lang, '') for sentence in old_sentences], new_sentences_raw
+                        )
+                        for j, new_sentence_text in enumerate(new_sentences_raw):
+                            old_j = alignment[j]
+                            old_sentence_obj = old_sentences[old_j] if old_j is not None else None
+                            if old_j == j and old_sentence_obj['content'].get(line_lang) == new_sentence_text:
+                                # Sentence unchanged: keep all translations
+                                new_sentences.append(old_sentence_obj)
+                            elif old_sentence_obj:
+                                # Sentence moved or trivially edited: carry translations over
+                                self._retranslations_saved += len(old_sentence_obj['content']) - 1
+                                new_sentences.append({
+                                    'sent_idx': j,
+                                    'content': {
+                                        **old_sentence_obj['content'],
+                                        line_lang: new_sentence_text
+                                    }
+                                })
+                            else:
+                                # Sentence new or changed: reset translations
                                 new_sentences.append({
-                                    'sent_idx': len(new_sentences),
+                                    'sent_idx': j,
                                     'content': {
-                                        self.source_lang: new_sentences_raw[j]
+                                        line_lang: new_sentence_text
                                     }
                                 })
 
-                            # Update the line
-                            self._lines[line_idx].update({
-                                'line_idx': line_idx,
-                                'beg': beg,
-                                'end': end,
-                                'text': text,
-                                'speaker': speaker,
-                                'sentences': new_sentences
-                            })
-
-                            # Update _to_translate for each sentence
-                            for sentence in new_sentences:
-                                self._add_to_translation_queue(
-                                    line_idx,
-                                    sentence['sent_idx'],
-                                    sentence['content'][self.source_lang]
-                                )
-                            updated = True
-                else:
-                    # New line
-                    new_sentences = []
-                    for i, sentence in enumerate(new_sentences_raw):
-                        new_sentences.append({
-                            'sent_idx': i,
-                            'content': {
-                                self.source_lang: sentence
-                            }
+                        # Update the line
+                        self._lines[line_idx].update({
+                            'line_idx': line_idx,
+                            'beg': beg,
+                            'end': end,
+                            'text': text,
+                            'speaker': speaker,
+                            'lang': line_lang,
+                            'sentences': new_sentences
                         })
-                    new_line = {
-                        'line_idx': len(self._lines),
-                        'beg': beg,
-                        'end': end,
-                        'text': text,
-                        'speaker': speaker,
-                        'sentences': new_sentences
-                    }
-                    self._lines.append(new_line)
-                    for sentence in new_sentences:
-                        self._add_to_translation_queue(
-                            len(self._lines) - 1,
-                            sentence['sent_idx'],
-                            sentence['content'][self.source_lang]
-                        )
-                    updated = True
 
-            if updated: # only push if changes occured
-                self._push_updated_transcript()
+                        self._mark_dirty(line_idx, (
+                            sentence['sent_idx'] for j, sentence in enumerate(new_sentences)
+                            if j >= len(old_sentences) or sentence is not old_sentences[j]
+                        ))
 
-    def submit_translation(self, translation_results, translation_time):
+                        # Update _to_translate for each sentence, dropping work for sentences that no longer exist
+                        for sentence in new_sentences:
+                            self._add_to_translation_queue(line_idx, sentence)
+                        for sent_idx in range(len(new_sentences), len(old_sentences)):
+                            self._to_translate.pop((line_idx, sent_idx), None)
+                            self._pending_changed = True
+                        if self._store:
+                            self._store.append_line(self._lines[line_idx])
+                        sentence_completed = sentence_completed or len(new_sentences) > len(old_sentences)
+                        updated = True
+            else:
+                # New line
+                new_sentences = []
+                for i, sentence in enumerate(new_sentences_raw):
+                    new_sentences.append({
+                        'sent_idx': i,
+                        'content': {
+                            self.source_lang: sentence
+                        }
+                    })
+                new_line = {
+                    'line_idx': len(self._lines),
+                    'beg': beg,
+                    'end': end,
+                    'text': text,
+                    'speaker': speaker,
+                    'lang': self.source_lang, # Source language of the line, stays as is after a switch
+                    'sentences': new_sentences
+                }
+                self._lines.append(new_line)
+                self._mark_dirty(new_line['line_idx'], (sentence['sent_idx'] for sentence in new_sentences))
+                if self._store:
+                    self._store.append_line(new_line)
+                for sentence in new_sentences:
+                    self._add_to_translation_queue(len(self._lines) - 1, sentence)
+                sentence_completed = sentence_completed or len(new_sentences) > 0
+                updated = True
+
+        LOGGER.debug(
+            f'Tokenized chunk in room <{self.room_id}>: {SENTENCE_TOKENIZER.hits - hits} cached, '
+            f'{SENTENCE_TOKENIZER.misses - misses} new lines'
+        )
+
+        if self._preview_source and (sentence_completed or not self._incomplete_sentence.startswith(self._preview_source)):
+            # Previews of a sentence that got completed or revised would be misleading
+            self._incomplete_sentence_translations = {}
+            self._preview_source = ""
+
+        if updated: # only push if changes occured
+            self._request_push(urgent=sentence_completed)
+
+    def _apply_source_lang(self, source_lang: str):
+        if source_lang == self.source_lang:
+            return
+        LOGGER.info(f'Switching source language of room <{self.room_id}> from {self.source_lang} to {source_lang}')
+        self.source_lang = source_lang
+        # Whisper keeps appending to the line in progress until its next segment break, its revisions are in the new lang
+        self._source_lang_line_idx = max(len(self._lines) - 1, 0)
+
+        # Queued work and previews were for sentences in the previous language
+        self._to_translate.clear()
+        self._pending_changed = True
+        self._incomplete_sentence_translations = {}
+        self._preview_source = ""
+        self._request_push(urgent=True)
+
+    def _apply_preview(self, source_text: str, translations: dict[str, str]):
+        if not source_text or not self._incomplete_sentence.startswith(source_text):
+            return # The sentence moved on while translating
+        self._incomplete_sentence_translations = translations
+        self._preview_source = source_text
+        self._request_push()
+
+    def _apply_translation(self, translation_results, translation_time):
         """
         translation_results: list of dicts, each like
             {
@@ -184,41 +345,43 @@ class TranscriptionManager:
                 'translation': ...    # translated sentence
             }
         """
-        with self.lock:
-            self.rolling_translation_delay.add(translation_time / len(translation_results))
-
-            for result in translation_results:
-                line_idx = result['line_idx']
-                sent_idx = result['sent_idx']
-                orig_sentence = result['sentence']
-                lang = result['lang']
-                translation = result['translation']
-
-                try:
-                    line = self._lines[line_idx]
-                    sent_obj = line['sentences'][sent_idx]
-                    current_sentence = sent_obj['content'][self.source_lang]
-                    if current_sentence == orig_sentence:
-                        # Store translation as 'content: {lang: "..."}'
-                        sent_obj['content'][lang] = translation
-                        # Update _to_translate entry for this sentence
-                        for entry in self._to_translate:
-                            if (entry['line_idx'] == line_idx and
-                                entry['sent_idx'] == sent_idx and
-                                entry['sentence'] == orig_sentence):
-                                entry['translated_langs'].add(lang)
-                                break
-                    else:
-                        LOGGER.warning(
-                            f"Discarded translation: sentence changed at line {line_idx}, sent {sent_idx}."
-                            f" Old: '{orig_sentence}' New: '{current_sentence}'"
-                        )
-                except IndexError:
+        self.rolling_translation_delay.add(translation_time / len(translation_results))
+
+        for result in translation_results:
+            line_idx = result['line_idx']
+            sent_idx = result['sent_idx']
+            orig_sentence = result['sentence']
+            lang = result['lang']
+            translation = result['translation']
+
+            try:
+                line = self._lines[line_idx]
+                sent_obj = line['sentences'][sent_idx]
+                current_sentence = sent_obj['content'].get(self.source_lang)
+                if line['lang'] == self.source_lang and current_sentence == orig_sentence:
+                    # Store translation as 'content: {lang: "..."}'
+                    sent_obj['content'][lang] = translation
+                    self._mark_dirty(line_idx, (sent_idx,))
+                    if self._store:
+                        self._store.append_translation(line_idx, sent_idx, lang, translation)
+                    # Update _to_translate entry for this sentence, evict it once all subscribed langs are done
+                    entry = self._to_translate.get((line_idx, sent_idx))
+                    if entry and entry['sentence'] == orig_sentence:
+                        entry['translated_langs'].add(lang)
+                        self._pending_changed = True
+                        if self._is_fully_translated(entry['translated_langs']):
+                            del self._to_translate[(line_idx, sent_idx)]
+                else:
                     LOGGER.warning(
-                        f"Discarded translation: line_idx {line_idx} or sent_idx {sent_idx} out of range."
+                        f"Discarded translation: sentence changed at line {line_idx}, sent {sent_idx}."
+                        f" Old: '{orig_sentence}' New: '{current_sentence}'"
                     )
+            except IndexError:
+                LOGGER.warning(
+                    f"Discarded translation: line_idx {line_idx} or sent_idx {sent_idx} out of range."
+                )
 
-            self._push_updated_transcript()
+        self._request_push()
 
     async def transcript_generator(self):
         while True:
@@ -233,18 +396,125 @@ class TranscriptionManager:
         
         LOGGER.info('Transcript generator terminated')
     
-    def _push_updated_transcript(self, broadcast=True):
-        # send last n lines of updated transcript to all connected clients
-        last_n_sents = get_last_n_sentences(self._lines, BACKLOG_SIZE)
-        self.last_transcript_chunk = {
-            'last_n_sents': last_n_sents,
+    @property
+    def incomplete_sentence(self) -> str:
+        return self._incomplete_sentence
+
+    @property
+    def last_transcript_chunk(self) -> dict:
+        """Full snapshot of the last n sentences, built lazily and only once per seq."""
+        return self._get_transcript_chunk()
+
+    def get_updates_since(self, last_seq: int=None, session: str=None) -> list[dict]:
+        """
+        Returns the messages a delta protocol client needs to catch up from `last_seq`:
+        A single merged delta if all missed deltas are still in the history, a full snapshot otherwise.
+        `last_seq` is only trusted if `session` is this room's, seq numbers start over after a server restart.
+        """
+        if session is not None and session not in self.known_session_ids:
+            last_seq = None
+        if last_seq is not None and last_seq == self.seq:
+            return []
+
+        oldest_seq = self._delta_history[0]['seq'] if self._delta_history else self.seq + 1
+        if last_seq is not None and oldest_seq - 1 <= last_seq < self.seq:
+            missed = [delta for delta in self._delta_history if delta['seq'] > last_seq]
+            return [merge_transcript_deltas(missed)]
+
+        return [{
+            'type': 'snapshot',
+            'session': self.session_id,
+            'seq': self.seq,
+            **self._get_transcript_chunk()
+        }]
+
+    def _get_transcript_chunk(self) -> dict:
+        if self._last_transcript_chunk_seq != self.seq or self._last_transcript_chunk is None:
+            self._last_transcript_chunk = {
+                'last_n_sents': get_last_n_sentences(self._lines, BACKLOG_SIZE),
+                'incomplete_sentence': self._incomplete_sentence,
+                'incomplete_sentence_translations': dict(self._incomplete_sentence_translations),
+                'transcription_delay': self.rolling_transcription_delay.get_average(),
+                'translation_delay': self.rolling_translation_delay.get_average()
+            }
+            self._last_transcript_chunk_seq = self.seq
+        return self._last_transcript_chunk
+
+    def _mark_dirty(self, line_idx: int, sent_idxs):
+        self._dirty_lines.setdefault(line_idx, set()).update(sent_idxs)
+
+    def _build_delta(self) -> dict:
+        """Collects every line and sentence changed since the last push into one numbered delta."""
+        lines = []
+        for line_idx in sorted(self._dirty_lines):
+            line = self._lines[line_idx]
+            sentences = line['sentences']
+            lines.append({
+                'line_idx': line_idx,
+                'beg': line['beg'],
+                'end': line['end'],
+                'speaker': line['speaker'],
+                'lang': line['lang'],
+                'sentence_count': len(sentences), # Lets clients drop sentences removed by a revision
+                'sentences': [
+                    {'sent_idx': sent_idx, 'content': dict(sentences[sent_idx]['content'])}
+                    for sent_idx in sorted(self._dirty_lines[line_idx])
+                    if sent_idx < len(sentences)
+                ]
+            })
+        self._dirty_lines.clear()
+
+        delta = {
+            'type': 'delta',
+            'session': self.session_id,
+            'seq': self.seq,
+            'lines': lines,
             'incomplete_sentence': self._incomplete_sentence,
+            'incomplete_sentence_translations': dict(self._incomplete_sentence_translations),
             'transcription_delay': self.rolling_transcription_delay.get_average(),
             'translation_delay': self.rolling_translation_delay.get_average()
         }
-        if broadcast and (last_n_sents or self._incomplete_sentence):
+        if self.seq == self._initial_seq + 1:
+            delta['reset'] = True # First delta of this session, clients drop state from before an engine restart
+        return delta
+
+    def _request_push(self, urgent: bool=False):
+        """
+        Schedules a broadcast at the end of the coalescing window, so bursts of chunks and translations go out together.
+        Urgent pushes (e.g. a completed sentence) get flushed once the current message is applied.
+        """
+        self._pushes_requested += 1
+        if urgent or self.push_window <= 0:
+            self._push_urgent = True
+        elif not self._push_handle:
+            self._push_handle = self._loop.call_later(self.push_window, self._flush_push)
+
+    def _flush_push(self):
+        if self._push_handle:
+            self._push_handle.cancel()
+            self._push_handle = None
+        self._push_urgent = False
+        self._pushes_sent += 1
+        self._push_updated_transcript()
+
+    def get_stats(self) -> dict:
+        return {
+            'seq': self.seq,
+            'push_window_ms': self.push_window * 1000,
+            'pushes_requested': self._pushes_requested,
+            'pushes_sent': self._pushes_sent,
+            'pending_translations': len(self._to_translate),
+            'retranslations_saved': self._retranslations_saved
+        }
+
+    def _push_updated_transcript(self, broadcast=True):
+        # only the changed lines get encoded, full snapshots are built lazily for clients that need them
+        self.seq += 1
+        delta = self._build_delta()
+        self._delta_history.append(delta)
+        if broadcast and (self._lines or self._incomplete_sentence):
             # Put the new result in the async queue
-            self._queue.put_nowait(self.last_transcript_chunk)
+            self._queue.put_nowait({'seq': self.seq, 'delta': delta})
 
         # logging for debugging
         if LOG_TRANSCRIPTS:
@@ -255,36 +525,91 @@ class TranscriptionManager:
                 self.log_directory,
                 self.log_path
             )
-            log_to_translate(self._to_translate, self.log_path)
-
-        # write changes to disk
-        if self.save_transcript:
-            transcript_db = os.path.join(self._room_directory, f'{self._open_time}.pkl')
-            with open(transcript_db, 'wb') as pkl_file:
-                pickle.dump(self._lines, pkl_file)
+            log_to_translate(list(self._to_translate.values()), self.log_path)
 
     def poll_sentences_to_translate(self, max_backlog: int):
-        with self.lock:
-            # Take last `max_backlog` items and reverse them
-            return self._to_translate[-max_backlog:][::-1]
-
-    def _add_to_translation_queue(self, line_idx, sent_idx, sentence):
-        # Find existing entry for this (line_idx, sent_idx)
-        for entry in self._to_translate:
-            if entry['line_idx'] == line_idx and entry['sent_idx'] == sent_idx:
-                if entry['sentence'] == sentence:
-                    # Sentence unchanged, nothing to do
-                    return
-                else:
-                    # Sentence changed, update text and reset translations
-                    entry['sentence'] = sentence
-                    entry['translated_langs'] = set()
-                    LOGGER.debug(f"Changed sentence: at line {line_idx}, sent {sent_idx}, text: {sentence}")
-                    return
-        # No entry found, add new
-        self._to_translate.append({
+        """
+        Returns up to `max_backlog` entries that still lack a translation, most recent first.
+        Each entry also carries its `age` (completed sentences after it) and whether it is `visible` in `last_n_sents`.
+        Reads the copy published by the writer, so it is safe to call from the translation worker thread.
+        """
+        return list(islice(self._pending_snapshot, max_backlog))
+
+    def _publish_pending(self):
+        # Walk back from the newest sentence until every queued one is found, queued sentences are usually recent
+        ages: dict[tuple[int, int], int] = {}
+        age = 0
+        for line_idx in range(len(self._lines) - 1, -1, -1):
+            if len(ages) >= len(self._to_translate):
+                break
+            for sentence in reversed(self._lines[line_idx]['sentences']):
+                key = (line_idx, sentence['sent_idx'])
+                if key in self._to_translate:
+                    ages[key] = age
+                age += 1
+
+        self._pending_snapshot = tuple(
+            {
+                **entry,
+                'translated_langs': set(entry['translated_langs']),
+                'age': ages.get(key, age),
+                'visible': ages.get(key, age) < BACKLOG_SIZE
+            }
+            for key, entry in reversed(self._to_translate.items())
+        )
+        self._pending_changed = False
+        if self._pending_snapshot:
+            self.pending_event.set() # Wake the translation worker right away instead of at its next poll
+
+    def _apply_requeue(self, max_backlog: int):
+        recent = []
+        for line_idx in range(len(self._lines) - 1, -1, -1):
+            for sentence in reversed(self._lines[line_idx]['sentences']):
+                recent.append((line_idx, sentence))
+                if len(recent) >= max_backlog:
+                    break
+            if len(recent) >= max_backlog:
+                break
+
+        # Queue oldest first, so the most recent sentences end up at the front of the next poll
+        for line_idx, sentence in reversed(recent):
+            self._add_to_translation_queue(line_idx, sentence)
+
+    def _apply_drop(self, keys: list[tuple[int, int]]):
+        for key in keys:
+            if self._to_translate.pop(key, None):
+                self._pending_changed = True
+
+    def _is_fully_translated(self, translated_langs: set[str]) -> bool:
+        return all(lang in translated_langs for lang in list(self.target_langs) if lang != self.source_lang)
+
+    def _add_to_translation_queue(self, line_idx, sentence_obj):
+        key = (line_idx, sentence_obj['sent_idx'])
+        sentence = sentence_obj['content'].get(self.source_lang)
+        if sentence is None or self._lines[line_idx]['lang'] != self.source_lang:
+            return # Transcribed before a source language switch, the text in self.source_lang would be a translation
+        entry = self._to_translate.get(key)
+        if entry:
+            if entry['sentence'] == sentence:
+                # Sentence unchanged, nothing to do
+                return
+            LOGGER.debug(f"Changed sentence: at line {line_idx}, sent {key[1]}, text: {sentence}")
+
+        # Translations already stored on the sentence (e.g. unchanged sentences of an edited line) carry over
+        translated_langs = set(sentence_obj['content'].keys()) - {self.source_lang}
+        self._pending_changed = True
+        if self._is_fully_translated(translated_langs):
+            self._to_translate.pop(key, None)
+            return
+
+        self._to_translate[key] = {
             'line_idx': line_idx,
-            'sent_idx': sent_idx,
+            'sent_idx': key[1],
             'sentence': sentence,
-            'translated_langs': set()
-        })
+            'translated_langs': translated_langs
+        }
+        self._to_translate.move_to_end(key)
+
+        # Bound the queue, the oldest entries would never be polled anyway
+        while len(self._to_translate) > self._max_pending_translations:
+            self._to_translate.popitem(last=False)
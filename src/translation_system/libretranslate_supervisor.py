@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Callable
+
+from io_config.logger import LOGGER
+
+
+class LibreTranslateSupervisor:
+    """
+    Runs every LibreTranslate replica as an asyncio subprocess and restarts it with exponential backoff if it dies.
+    Output is drained continuously into our logger, a full pipe buffer would otherwise block LibreTranslate.
+    """
+    def __init__(self, host: str, ports: list[int], restart_backoff: float=1, max_restart_backoff: float=60, stable_after: float=60,
+                 on_exit: Callable[[int], None]=None):
+        self._host = host
+        self._ports = ports
+        self._restart_backoff = restart_backoff
+        self._max_restart_backoff = max_restart_backoff
+        self._stable_after = stable_after # Seconds a replica has to stay up before its backoff resets
+        self._processes: dict[int, asyncio.subprocess.Process] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._restart_counts: dict[int, int] = {port: 0 for port in ports}
+        self._on_exit = on_exit # Called with the port of every replica that exited
+
+    def start(self):
+        """Needs to be called from the event loop."""
+        self._tasks = [asyncio.create_task(self._supervise(port)) for port in self._ports]
+
+    async def stop(self, timeout: float=10):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        for port, process in self._processes.items():
+            if process.returncode is None:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout)
+                except asyncio.TimeoutError:
+                    LOGGER.warning(f'LibreTranslate on port {port} did not terminate within {timeout}s, killing it')
+                    process.kill()
+        self._processes.clear()
+
+    async def _supervise(self, port: int):
+        backoff = self._restart_backoff
+        while True:
+            LOGGER.info(f'Starting LibreTranslate server: {self._host}:{port}')
+            started = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    'poetry', 'run', 'libretranslate',
+                    '--host', self._host,
+                    '--port', str(port),
+                    # '--load-only', 'en,de', # Only to be used for saving resources during debugging
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+            except OSError as e:
+                LOGGER.error(f'Failed to start LibreTranslate on port {port}: {e}')
+            else:
+                self._processes[port] = process
+                LOGGER.info(f'LibreTranslate server started with PID {process.pid}')
+                await self._drain_output(port, process.stdout)
+                return_code = await process.wait()
+                LOGGER.warning(f'LibreTranslate on port {port} exited with code {return_code}')
+                if self._on_exit:
+                    self._on_exit(port)
+
+            if time.monotonic() - started >= self._stable_after:
+                backoff = self._restart_backoff
+            self._restart_counts[port] += 1
+            LOGGER.info(f'Restarting LibreTranslate on port {port} in {backoff:.1f}s')
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._max_restart_backoff)
+
+    async def _drain_output(self, port: int, stream: asyncio.StreamReader):
+        # Returns once the process closed its output, usually because it exited
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                line = await stream.read(2 ** 16) # Line longer than the stream limit, log it in parts
+            if not line:
+                return
+            LOGGER.info(f'[LibreTranslate:{port}] {line.decode(errors="replace").rstrip()}')
+
+    def get_stats(self) -> dict:
+        return {
+            str(port): {
+                'pid': self._processes[port].pid if port in self._processes else None,
+                'running': port in self._processes and self._processes[port].returncode is None,
+                'restarts': self._restart_counts[port]
+            }
+            for port in self._ports
+        }
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Union
+
+from io_config.config import LT_LOCAL_DEVICE
+from io_config.logger import LOGGER
+from rolling_average import RollingAverage
+from translation_system.translation_backend import TranslationBackend, TranslationError
+
+PIVOT_LANG = 'en' # Argos models mostly translate from or to english, other pairs go through it like in LibreTranslate
+
+
+class LocalTranslationBackend(TranslationBackend):
+    """
+    Runs the locally installed argos models with CTranslate2 inside the server process, skipping the HTTP hop.
+    Each request is translated as one batch on a dedicated thread, models are loaded on first use.
+    """
+    name = 'local'
+
+    def __init__(self, device: str=LT_LOCAL_DEVICE, beam_size: int=2, max_batch_size: int=32):
+        self._device = device
+        self._beam_size = beam_size
+        self._max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='LocalTranslation')
+        self._packages: dict[tuple[str, str], Any] = {} # (from_code, to_code) -> installed argos package
+        self._translators: dict[tuple[str, str], Any] = {} # (from_code, to_code) -> loaded ctranslate2.Translator
+
+        self._request_count = 0
+        self._sentence_count = 0
+        self.rolling_latency = RollingAverage(n=100)
+
+    async def start(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._load_packages)
+
+    def _load_packages(self):
+        try:
+            # Both ship with LibreTranslate, only needed for this backend
+            import argostranslate.package
+        except ImportError as e:
+            raise TranslationError(f'Local translation backend requires argostranslate and ctranslate2: {e}')
+
+        for package in argostranslate.package.get_installed_packages():
+            self._packages[(package.from_code, package.to_code)] = package
+        LOGGER.info(f'Found {len(self._packages)} installed argos models: {sorted(self._packages)}')
+
+    async def translate(self, q: Union[str, list[str]], source: str, target: str) -> Union[str, list[str]]:
+        sentences = q if isinstance(q, list) else [q]
+        start = time.perf_counter()
+        translations = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._translate_batch, sentences, source, target
+        )
+        self._request_count += 1
+        self._sentence_count += len(sentences)
+        self.rolling_latency.add(time.perf_counter() - start)
+        return translations if isinstance(q, list) else translations[0]
+
+    def _translate_batch(self, sentences: list[str], source: str, target: str) -> list[str]:
+        if source == target:
+            return list(sentences)
+        if (source, target) in self._packages:
+            return self._run_model(sentences, source, target)
+        if (source, PIVOT_LANG) in self._packages and (PIVOT_LANG, target) in self._packages:
+            return self._run_model(self._run_model(sentences, source, PIVOT_LANG), PIVOT_LANG, target)
+        raise TranslationError(f"No local model installed for '{source}' -> '{target}'")
+
+    def _run_model(self, sentences: list[str], source: str, target: str) -> list[str]:
+        package = self._packages[(source, target)]
+        translator = self._get_translator(source, target)
+
+        tokenized = [package.tokenizer.encode(sentence) for sentence in sentences]
+        target_prefix = [[package.target_prefix]] * len(tokenized) if package.target_prefix else None
+        try:
+            results = translator.translate_batch(
+                tokenized,
+                target_prefix=target_prefix,
+                replace_unknowns=True,
+                max_batch_size=self._max_batch_size,
+                beam_size=self._beam_size
+            )
+        except RuntimeError as e:
+            raise TranslationError(f"Local translation '{source}' -> '{target}' failed: {e}")
+
+        translations = []
+        for result in results:
+            translation = package.tokenizer.decode(result.hypotheses[0])
+            if package.target_prefix and translation.startswith(package.target_prefix):
+                translation = translation[len(package.target_prefix):]
+            translations.append(translation.lstrip(' ')) # The tokenizer adds a leading space
+        return translations
+
+    def _get_translator(self, source: str, target: str):
+        translator = self._translators.get((source, target))
+        if translator is None:
+            import ctranslate2
+
+            model_path = str(self._packages[(source, target)].package_path / 'model')
+            LOGGER.info(f"Loading local translation model '{source}' -> '{target}' on {self._device}")
+            translator = ctranslate2.Translator(model_path, device=self._device)
+            self._translators[(source, target)] = translator
+        return translator
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        self._translators.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            'backend': self.name,
+            'requests': self._request_count,
+            'sentences': self._sentence_count,
+            'loaded_models': [f'{source}->{target}' for source, target in self._translators],
+            'avg_latency_ms': self.rolling_latency.get_average() * 1000
+        }
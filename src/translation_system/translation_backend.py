@@ -0,0 +1,62 @@
+import asyncio
+from typing import Callable, Union
+
+
+class TranslationBackend:
+    """
+    Engine the translation service sends its requests to, exactly one is active per process.
+    `translate` accepts a single string or a list of strings and answers in kind.
+    """
+    name = ''
+    on_unavailable: Callable[[str], None] = None # Called with a reason once the backend can't serve requests anymore
+
+    async def start(self):
+        """Loads whatever the backend needs, called once from the server lifespan."""
+
+    async def translate(self, q: Union[str, list[str]], source: str, target: str) -> Union[str, list[str]]:
+        raise NotImplementedError
+
+    async def close(self):
+        """Releases connections or models, called once from the server lifespan."""
+
+    def get_stats(self) -> dict:
+        return {'backend': self.name}
+
+
+class FakeTranslationBackend(TranslationBackend):
+    """Deterministic backend for tests and for measuring everything but the translation itself."""
+    name = 'fake'
+
+    def __init__(self, latency: float=0.0):
+        self._latency = latency
+        self._request_count = 0
+
+    async def translate(self, q: Union[str, list[str]], source: str, target: str) -> Union[str, list[str]]:
+        self._request_count += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if isinstance(q, list):
+            return [f'[{target}] {text}' for text in q]
+        return f'[{target}] {q}'
+
+    def get_stats(self) -> dict:
+        return {'backend': self.name, 'requests': self._request_count}
+
+
+def create_translation_backend(name: str) -> TranslationBackend:
+    # Imported here, so only the selected backend's dependencies have to be installed
+    if name == 'http':
+        from translation_system.translation_client import create_translation_client
+        return create_translation_client()
+    if name == 'local':
+        from translation_system.local_translation_backend import LocalTranslationBackend
+        return LocalTranslationBackend()
+    if name == 'fake':
+        return FakeTranslationBackend()
+    raise ValueError(f"Unknown translation backend '{name}', expected 'http', 'local' or 'fake'")
+
+# ----- CUSTOM EXCEPTIONS ------
+class TranslationError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
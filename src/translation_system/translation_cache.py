@@ -0,0 +1,146 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from io_config.config import TRANSLATION_CACHE_DB, TRANSLATION_CACHE_SIZE, TRANSLATION_BACKEND_NAME
+from io_config.logger import LOGGER
+
+
+def normalize_sentence(sentence: str) -> str:
+    # Whitespace differences shouldn't cause a retranslation
+    return ' '.join(sentence.split())
+
+
+class TranslationCache:
+    """
+    LRU cache of translations keyed by (source_lang, target_lang, normalized sentence), shared by every room.
+    Optionally persisted to a local sqlite file, so restarts and repeated phrases across talks hit the cache.
+    Entries on disk are kept per `backend`, translations of one backend are never served under another.
+    Lookups only touch memory, new entries are written to disk in the background.
+    """
+    def __init__(self, max_size: int=50000, db_path: str=None, flush_interval: float=5.0, backend: str='http'):
+        self._max_size = max_size
+        self._db_path = db_path
+        self._backend = backend
+        self._flush_interval = flush_interval
+        self._cache: OrderedDict[tuple[str, str, str], str] = OrderedDict()
+        self._pending_writes: list[tuple[str, str, str, str, float]] = []
+        self._pending_touches: dict[tuple[str, str, str], float] = {} # Hits since the last flush, key -> last used
+        self._db_lock = threading.Lock() # Flushes run in executor threads
+        self._flush_task: asyncio.Task = None
+        self._pair_stats: dict[str, list[int]] = {} # 'source->target' -> [hits, misses]
+
+    def get(self, source_lang: str, target_lang: str, sentence: str) -> Optional[str]:
+        key = (source_lang, target_lang, normalize_sentence(sentence))
+        stats = self._pair_stats.setdefault(f'{source_lang}->{target_lang}', [0, 0])
+        translation = self._cache.get(key)
+        if translation is None:
+            stats[1] += 1
+            return None
+
+        stats[0] += 1
+        self._cache.move_to_end(key)
+        if self._db_path:
+            self._pending_touches[key] = time.time() # Keeps frequently hit phrases from being trimmed on disk
+        return translation
+
+    def put(self, source_lang: str, target_lang: str, sentence: str, translation: str):
+        key = (source_lang, target_lang, normalize_sentence(sentence))
+        self._cache[key] = translation
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+        if self._db_path:
+            self._pending_writes.append((self._backend, *key, translation, time.time()))
+
+    def load(self):
+        """Fills the in-memory cache with the most recently used entries from disk."""
+        if not self._db_path:
+            return
+
+        directory = os.path.dirname(self._db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._db_lock, sqlite3.connect(self._db_path) as db:
+            columns = [column[1] for column in db.execute('PRAGMA table_info(translations)')]
+            if columns and 'backend' not in columns:
+                # Files from before entries were kept per backend might mix in placeholders of the fake backend
+                LOGGER.warning(f'Dropping cached translations of unknown backends from {self._db_path}')
+                db.execute('DROP TABLE translations')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                'backend TEXT, source_lang TEXT, target_lang TEXT, sentence TEXT, translation TEXT, last_used REAL, '
+                'PRIMARY KEY (backend, source_lang, target_lang, sentence))'
+            )
+            # Bound the file to the same size as the in-memory cache, per backend
+            db.execute(
+                'DELETE FROM translations WHERE backend = ? AND rowid NOT IN '
+                '(SELECT rowid FROM translations WHERE backend = ? ORDER BY last_used DESC LIMIT ?)',
+                (self._backend, self._backend, self._max_size)
+            )
+            rows = db.execute(
+                'SELECT source_lang, target_lang, sentence, translation FROM translations WHERE backend = ? ORDER BY last_used ASC',
+                (self._backend,)
+            ).fetchall()
+
+        for source_lang, target_lang, sentence, translation in rows:
+            self._cache[(source_lang, target_lang, sentence)] = translation
+        LOGGER.info(f'Loaded {len(rows)} cached {self._backend} translations from {self._db_path}')
+
+    def start(self):
+        """Starts flushing new entries to disk periodically, needs to be called from the event loop."""
+        if self._db_path:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def _flush_periodically(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        if not self._db_path or not (self._pending_writes or self._pending_touches):
+            return
+
+        writes, self._pending_writes = self._pending_writes, []
+        touches, self._pending_touches = self._pending_touches, {}
+        try:
+            with self._db_lock, sqlite3.connect(self._db_path) as db:
+                db.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)', writes)
+                db.executemany(
+                    'UPDATE translations SET last_used = ? WHERE backend = ? AND source_lang = ? AND target_lang = ? AND sentence = ?',
+                    [(last_used, self._backend, *key) for key, last_used in touches.items()]
+                )
+        except sqlite3.Error as e:
+            LOGGER.error(f'Failed to persist {len(writes)} translations to {self._db_path}: {e}')
+
+    def get_stats(self) -> dict:
+        return {
+            'size': len(self._cache),
+            'max_size': self._max_size,
+            'persistent': bool(self._db_path),
+            'backend': self._backend,
+            'pairs': {
+                pair: {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': hits / (hits + misses) if hits + misses else 0
+                }
+                for pair, (hits, misses) in self._pair_stats.items()
+            }
+        }
+
+# ---- INITIALIZE SINGLETON ----
+TRANSLATION_CACHE = TranslationCache(TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_DB or None, backend=TRANSLATION_BACKEND_NAME)
@@ -0,0 +1,209 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Union
+
+import aiohttp
+
+from io_config.config import LT_HOST, LT_PORT, LT_POOL_SIZE, LT_RETRIES, LT_TIMEOUT, LT_REPLICAS, LT_HEALTH_INTERVAL
+from io_config.logger import LOGGER
+from rolling_average import RollingAverage
+from translation_system.translation_backend import TranslationBackend, TranslationError
+
+
+class _Replica:
+    def __init__(self, base_url: str, throughput_window: float):
+        self.base_url = base_url
+        self.healthy = True # Assumed until a request or health check fails
+        self.outstanding = 0
+        self.request_count = 0
+        self.sentence_count = 0
+        self.failure_count = 0
+        self.rolling_latency = RollingAverage(n=100)
+        self._throughput_window = throughput_window
+        self._completions: deque[tuple[float, int]] = deque() # (time, sentences) within the throughput window
+
+    def record_completion(self, sentences: int):
+        now = time.monotonic()
+        self.sentence_count += sentences
+        self._completions.append((now, sentences))
+        while self._completions and self._completions[0][0] < now - self._throughput_window:
+            self._completions.popleft()
+
+    def get_throughput(self) -> float:
+        """Translated sentences per second within the throughput window."""
+        cutoff = time.monotonic() - self._throughput_window
+        return sum(sentences for completed, sentences in self._completions if completed >= cutoff) / self._throughput_window
+
+
+class TranslationClient(TranslationBackend):
+    """
+    Async LibreTranslate client on a single aiohttp session, shared by all rooms.
+    Connections are kept alive in a pool, so sentences don't pay for a new TCP handshake each.
+    Requests are balanced over one or more LibreTranslate replicas by least outstanding requests,
+    replicas that fail are skipped until a periodic health check succeeds again.
+    """
+    name = 'http'
+
+    def __init__(self, base_urls: list[str], pool_size: int=16, timeout: float=10, retries: int=2, retry_backoff: float=0.2,
+                 health_interval: float=5, throughput_window: float=60):
+        self._replicas = [_Replica(base_url, throughput_window) for base_url in base_urls]
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._retries = retries
+        self._retry_backoff = retry_backoff
+        self._health_interval = health_interval
+        self._health_task: asyncio.Task = None
+        self._session: aiohttp.ClientSession = None
+
+        self._request_count = 0
+        self._failure_count = 0
+        self._retry_count = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+        self.rolling_latency = RollingAverage(n=100)
+
+    async def start(self):
+        self._health_task = asyncio.create_task(self._check_health_periodically())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily, aiohttp sessions have to be created inside the running event loop
+        if not self._session or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._pool_size * len(self._replicas), limit_per_host=self._pool_size, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+                trace_configs=[trace_config]
+            )
+        return self._session
+
+    async def _on_connection_created(self, session, trace_config_ctx, params):
+        self._connections_created += 1
+
+    async def _on_connection_reused(self, session, trace_config_ctx, params):
+        self._connections_reused += 1
+
+    def _pick_replica(self) -> _Replica:
+        # Fall back to all replicas if none is healthy, a request might still get through
+        candidates = [replica for replica in self._replicas if replica.healthy] or self._replicas
+        return min(candidates, key=lambda replica: replica.outstanding)
+
+    def _mark_unhealthy(self, replica: _Replica, error: str, probed: bool=False):
+        if replica.healthy:
+            LOGGER.warning(f'LibreTranslate replica {replica.base_url} is down ({error}), skipping it until it recovers')
+        replica.healthy = False
+        # Single requests fail under ordinary load too, only failed health checks count as the backend being down
+        if probed and self.on_unavailable and not any(replica.healthy for replica in self._replicas):
+            self.on_unavailable('all LibreTranslate replicas are down')
+
+    async def _check_health_periodically(self):
+        while True:
+            await asyncio.gather(*(self._check_health(replica) for replica in self._replicas))
+            await asyncio.sleep(self._health_interval)
+
+    async def _check_health(self, replica: _Replica):
+        try:
+            async with self._get_session().get(f'{replica.base_url}languages', timeout=aiohttp.ClientTimeout(total=self._health_interval)) as response:
+                healthy = response.status == 200
+                error = f'HTTP {response.status}'
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            healthy = False
+            error = repr(e)
+
+        if healthy and not replica.healthy:
+            LOGGER.info(f'LibreTranslate replica {replica.base_url} is back up')
+            replica.healthy = True
+        elif not healthy:
+            self._mark_unhealthy(replica, error, probed=True)
+
+    async def translate(self, q: Union[str, list[str]], source: str, target: str) -> Union[str, list[str]]:
+        """
+        Translates a single string or a list of strings (in one request), retrying with jittered backoff.
+        Raises a TranslationError once all retries are used up or if the request itself is invalid.
+        """
+        params = {'q': q, 'source': source, 'target': target}
+        for attempt in range(self._retries + 1):
+            replica = self._pick_replica() # Retries usually land on another replica
+            start = time.perf_counter()
+            self._request_count += 1
+            replica.request_count += 1
+            replica.outstanding += 1
+            try:
+                async with self._get_session().post(f'{replica.base_url}translate', json=params) as response:
+                    if response.status < 500:
+                        body = await response.json(content_type=None)
+                        if response.status != 200:
+                            # Invalid request (e.g. unsupported language), retrying won't help
+                            self._failure_count += 1
+                            raise TranslationError(f"LibreTranslate returned HTTP {response.status}: {body.get('error')}")
+                        latency = time.perf_counter() - start
+                        self.rolling_latency.add(latency)
+                        replica.rolling_latency.add(latency)
+                        replica.record_completion(len(q) if isinstance(q, list) else 1)
+                        return body['translatedText']
+                    error = f'HTTP {response.status}'
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+                error = repr(e)
+            finally:
+                replica.outstanding -= 1
+
+            self._failure_count += 1
+            replica.failure_count += 1
+            self._mark_unhealthy(replica, error)
+            if attempt < self._retries:
+                self._retry_count += 1
+                delay = self._retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                LOGGER.debug(f'Translation request failed ({error}), retrying in {delay:.2f}s...')
+                await asyncio.sleep(delay)
+
+        raise TranslationError(f'Translation request failed after {self._retries + 1} attempts: {error}')
+
+    async def close(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def get_stats(self) -> dict:
+        connections = self._connections_created + self._connections_reused
+        return {
+            'backend': self.name,
+            'requests': self._request_count,
+            'failures': self._failure_count,
+            'retries': self._retry_count,
+            'connections_created': self._connections_created,
+            'connections_reused': self._connections_reused,
+            'connection_reuse_rate': self._connections_reused / connections if connections else 0,
+            'avg_latency_ms': self.rolling_latency.get_average() * 1000,
+            'replicas': {
+                replica.base_url: {
+                    'healthy': replica.healthy,
+                    'outstanding': replica.outstanding,
+                    'requests': replica.request_count,
+                    'sentences': replica.sentence_count,
+                    'failures': replica.failure_count,
+                    'sentences_per_second': replica.get_throughput(),
+                    'avg_latency_ms': replica.rolling_latency.get_average() * 1000
+                }
+                for replica in self._replicas
+            }
+        }
+
+
+def get_replica_ports() -> list[int]:
+    return [LT_PORT + replica for replica in range(LT_REPLICAS)]
+
+def create_translation_client() -> TranslationClient:
+    return TranslationClient(
+        [f'http://{LT_HOST}:{port}/' for port in get_replica_ports()],
+        pool_size=LT_POOL_SIZE,
+        timeout=LT_TIMEOUT,
+        retries=LT_RETRIES,
+        health_interval=LT_HEALTH_INTERVAL
+    )
@@ -0,0 +1,60 @@
+from typing import Any
+
+
+class TranslationScheduler:
+    """
+    Decides which pending sentences a translation cycle works on, and in which order the target langs go.
+    Work is scored by sentence recency, whether the sentence is still visible to viewers (part of `last_n_sents`),
+    and how many viewers subscribed to the target lang. Under overload, sentences that scrolled out of view are dropped.
+    """
+    def __init__(self, max_batch_translations: int=4, visible_weight: float=4.0):
+        self._max_batch_translations = max_batch_translations
+        self._visible_weight = visible_weight
+        self.scheduled_count = 0
+        self.dropped_count = 0 # Stale sentences dropped under overload
+
+    def score(self, entry: dict[str, Any], subscribers: int) -> float:
+        recency = 1 / (1 + entry['age']) # The newest sentence has age 0
+        visibility = self._visible_weight if entry['visible'] else 1
+        return subscribers * visibility * recency
+
+    def schedule(self, entries: list[dict[str, Any]], target_langs: dict[str, int]) -> tuple[list[tuple[str, list[dict]]], list[dict]]:
+        """
+        Returns the batches to translate as (target_lang, entries), most important lang first,
+        along with the stale entries that should be dropped from the queue.
+        """
+        work: dict[str, list[dict]] = {}
+        for target_lang, subscribers in list(target_langs.items()):
+            pending = [entry for entry in entries if target_lang not in entry['translated_langs']]
+            if subscribers > 0 and pending:
+                work[target_lang] = pending
+
+        # Overloaded if this cycle can't cover every pending (sentence, lang) pair
+        overloaded = any(len(pending) > self._max_batch_translations for pending in work.values())
+        stale = [entry for entry in entries if not entry['visible']] if overloaded else []
+        if stale:
+            work = {
+                target_lang: [entry for entry in pending if entry['visible']]
+                for target_lang, pending in work.items()
+            }
+
+        batches = []
+        for target_lang, pending in work.items():
+            if not pending:
+                continue
+            subscribers = target_langs.get(target_lang, 0)
+            pending.sort(key=lambda entry: self.score(entry, subscribers), reverse=True)
+            batch = pending[:self._max_batch_translations]
+            batches.append((target_lang, batch, self.score(batch[0], subscribers)))
+
+        # The lang semaphore admits batches in order, so the most watched langs get translated first
+        batches.sort(key=lambda batch: batch[2], reverse=True)
+        self.scheduled_count += sum(len(batch) for _, batch, _ in batches)
+        self.dropped_count += len(stale)
+        return [(target_lang, batch) for target_lang, batch, _ in batches], stale
+
+    def get_stats(self) -> dict:
+        return {
+            'scheduled_translations': self.scheduled_count,
+            'dropped_stale': self.dropped_count
+        }
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Union
+
+from io_config.config import LT_MAX_IN_FLIGHT, LT_ROOM_QUEUE_SIZE, TRANSLATION_BACKEND_NAME
+from io_config.logger import LOGGER
+from rolling_average import RollingAverage
+from translation_system.translation_backend import TranslationBackend, TranslationError, create_translation_backend
+
+
+class _RoomQueue:
+    def __init__(self):
+        self.requests: deque[tuple[asyncio.Future, Union[str, list[str]], str, str, float]] = deque()
+        self.in_flight = 0
+        self.completed = 0
+        self.pushbacks = 0 # Batches the room's worker had to hold back because its share was used up
+        self.rolling_wait = RollingAverage(n=20)
+
+
+class TranslationService:
+    """
+    Process-wide gate in front of the translation backend, every room's worker sends its requests through here.
+    Waiting requests are dispatched round-robin between rooms, with a cap on the total requests in flight.
+    Each room may only have `room_queue_size` requests queued or in flight, workers hold back work beyond that.
+    """
+    def __init__(self, backend: TranslationBackend, max_in_flight: int=8, room_queue_size: int=4):
+        self.backend = backend
+        self._max_in_flight = max_in_flight
+        self._room_queue_size = room_queue_size
+        self._rooms: dict[str, _RoomQueue] = {}
+        self._waiting: OrderedDict[str, _RoomQueue] = OrderedDict() # Rooms with queued requests, in round-robin order
+        self._in_flight = 0
+        self.ready = False # Set once a test translation went through the backend, cleared when the backend goes down
+        self.startup_to_ready: float = None
+        self._readiness_losses = 0
+        self._test_langs: tuple[str, str] = None
+        self._ready_task: asyncio.Task = None
+        backend.on_unavailable = self.mark_not_ready
+
+    async def translate(self, room_id: str, q: Union[str, list[str]], source: str, target: str) -> Union[str, list[str]]:
+        """Queues a request for the room and waits for its turn, raises a TranslationError like the client."""
+        room = self._rooms.setdefault(room_id, _RoomQueue())
+        future = asyncio.get_running_loop().create_future()
+        room.requests.append((future, q, source, target, time.perf_counter()))
+        self._waiting.setdefault(room_id, room)
+        self._dispatch()
+        return await future
+
+    def start_readiness_check(self, langs: list[str]):
+        """Starts test translations between two of `langs` until the backend answers, needs to be called from the event loop."""
+        source = 'en' if 'en' in langs else langs[0]
+        target = next((lang for lang in langs if lang != source), None)
+        if target is None:
+            LOGGER.warning('No language pair to test the translation backend with, assuming it is ready')
+            self.ready = True
+            return
+        self._test_langs = (source, target)
+        self._ready_task = asyncio.create_task(self.wait_until_ready(source, target))
+
+    def stop_readiness_check(self):
+        if self._ready_task:
+            self._ready_task.cancel()
+            self._ready_task = None
+
+    def mark_not_ready(self, reason: str):
+        """Clears readiness until another test translation goes through, e.g. after a LibreTranslate replica crashed."""
+        if not self.ready or not self._test_langs:
+            return # Not ready or nothing to test with
+        LOGGER.warning(f'Translation backend not ready anymore: {reason}')
+        self.ready = False
+        self._readiness_losses += 1
+        if not self._ready_task or self._ready_task.done():
+            self._ready_task = asyncio.create_task(self.wait_until_ready(*self._test_langs))
+
+    async def wait_until_ready(self, source: str, target: str, retry_interval: float=2):
+        """Repeats a test translation until the backend answers, models might take minutes to load."""
+        started = time.monotonic()
+        while True:
+            try:
+                await self.backend.translate('Hello world.', source, target)
+                break
+            except TranslationError as e:
+                LOGGER.debug(f'Translation backend not ready yet: {e}')
+            await asyncio.sleep(retry_interval)
+
+        self.ready = True
+        if self.startup_to_ready is None:
+            self.startup_to_ready = time.monotonic() - started
+        LOGGER.info(f'Translation backend ready after {time.monotonic() - started:.1f}s')
+
+    def get_capacity(self, room_id: str) -> int:
+        """Number of requests the room may still submit before it has to back off."""
+        room = self._rooms.get(room_id)
+        if not room:
+            return self._room_queue_size
+        return max(self._room_queue_size - len(room.requests) - room.in_flight, 0)
+
+    def record_pushback(self, room_id: str, count: int):
+        self._rooms.setdefault(room_id, _RoomQueue()).pushbacks += count
+
+    def remove_room(self, room_id: str):
+        """Drops the stats of a deactivated room, requests already queued still get answered."""
+        room = self._rooms.get(room_id)
+        if room and not room.requests and not room.in_flight:
+            del self._rooms[room_id]
+
+    def _dispatch(self):
+        while self._in_flight < self._max_in_flight and self._waiting:
+            room_id, room = next(iter(self._waiting.items()))
+            future, q, source, target, queued_at = room.requests.popleft()
+            # Next request comes from the next room
+            if room.requests:
+                self._waiting.move_to_end(room_id)
+            else:
+                del self._waiting[room_id]
+            if future.done():
+                continue # Cancelled while waiting, e.g. the room was closed
+
+            room.rolling_wait.add(time.perf_counter() - queued_at)
+            room.in_flight += 1
+            self._in_flight += 1
+            asyncio.create_task(self._run(room, future, q, source, target))
+
+    async def _run(self, room: _RoomQueue, future: asyncio.Future, q: Union[str, list[str]], source: str, target: str):
+        try:
+            result = await self.backend.translate(q, source, target)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            room.in_flight -= 1
+            room.completed += 1
+            self._in_flight -= 1
+            self._dispatch()
+
+    def get_stats(self) -> dict:
+        return {
+            'ready': self.ready,
+            'startup_to_ready_s': self.startup_to_ready,
+            'readiness_losses': self._readiness_losses,
+            'in_flight': self._in_flight,
+            'max_in_flight': self._max_in_flight,
+            'room_queue_size': self._room_queue_size,
+            'rooms': {
+                room_id: {
+                    'queue_depth': len(room.requests),
+                    'in_flight': room.in_flight,
+                    'completed': room.completed,
+                    'pushbacks': room.pushbacks,
+                    'avg_wait_ms': room.rolling_wait.get_average() * 1000
+                }
+                for room_id, room in self._rooms.items()
+            }
+        }
+
+# ---- INITIALIZE SINGLETON ----
+TRANSLATION_SERVICE = TranslationService(create_translation_backend(TRANSLATION_BACKEND_NAME), LT_MAX_IN_FLIGHT, LT_ROOM_QUEUE_SIZE)
@@ -1,25 +1,40 @@
-import threading
+import asyncio
+import os
 import time
 
-from libretranslatepy import LibreTranslateAPI
-from urllib.error import HTTPError
-
 from io_config.cli import BACKLOG_SIZE
-from io_config.config import LT_HOST, LT_PORT
+from io_config.config import LT_MAX_PARALLEL_LANGS, LT_MIN_CYCLE_INTERVAL, LT_SPECULATIVE_TRANSLATION, LT_SPECULATIVE_DEBOUNCE, \
+    LT_SPECULATIVE_MIN_CHANGE
 from io_config.logger import LOGGER
 from transcription_system.transcription_manager import TranscriptionManager
+from translation_system.translation_cache import TRANSLATION_CACHE
+from translation_system.translation_backend import TranslationError
+from translation_system.translation_scheduler import TranslationScheduler
+from translation_system.translation_service import TRANSLATION_SERVICE
 
 
-class TranslationWorker(threading.Thread):
-    def __init__(self, transcription_manager: TranscriptionManager, poll_interval=1.0, target_langs: dict[str, int]={}, target_lang: str=None, max_batch_translations=4):
-        super().__init__()
-        self.lt = LibreTranslateAPI(f"http://{LT_HOST}:{LT_PORT}")
-        self.poll_interval = poll_interval
-        self.daemon = True
+class TranslationWorker:
+    def __init__(self, transcription_manager: TranscriptionManager, poll_interval=1.0, target_langs: dict[str, int]=None, target_lang: str=None, max_batch_translations=4,
+                 max_parallel_langs: int=LT_MAX_PARALLEL_LANGS, min_cycle_interval: float=LT_MIN_CYCLE_INTERVAL,
+                 speculative: bool=LT_SPECULATIVE_TRANSLATION, speculative_debounce: float=LT_SPECULATIVE_DEBOUNCE,
+                 speculative_min_change: int=LT_SPECULATIVE_MIN_CHANGE):
+        self.poll_interval = poll_interval # Fallback, the worker is normally woken by the transcription manager
+        self.min_cycle_interval = min_cycle_interval # Keeps bursts of new sentences from causing a tight loop
         self._transcription_manager: TranscriptionManager = transcription_manager
-        self._stop_event = threading.Event()
-        self.target_langs = target_langs
-        self._max_batch_translations = max_batch_translations
+        self._task: asyncio.Task = None
+        self.target_langs = target_langs if target_langs is not None else {} # Avoid sharing one dict between rooms
+        self._transcription_manager.target_langs = self.target_langs # Lets the manager evict fully translated sentences
+        self._source_lang = transcription_manager.source_lang # Ahead of the manager's while a switch is being applied
+        self._source_lang_subscribers = 0 # Sockets with the source lang as target, they become subscribers after a switch
+        self._scheduler = TranslationScheduler(max_batch_translations)
+        self._max_parallel_langs = max_parallel_langs
+        self._lang_semaphore: asyncio.Semaphore = None
+        # Speculative translation of the incomplete sentence
+        self.speculative = speculative
+        self.speculative_debounce = speculative_debounce
+        self.speculative_min_change = speculative_min_change # Min changed chars before the preview gets retranslated
+        self._preview_loop_task: asyncio.Task = None
+        self._preview_task: asyncio.Task = None
         if target_lang:
             self.subscribe_target_lang(target_lang)
 
@@ -27,15 +42,22 @@ class TranslationWorker(threading.Thread):
     
     def subscribe_target_lang(self, target_lang: str):
         """Increment count for subscription to a target language."""
-        if target_lang == self._transcription_manager.source_lang:
+        if target_lang == self._source_lang:
+            self._source_lang_subscribers += 1
             return  # don't allow source lang subscription
         
         current_count = self.target_langs.get(target_lang, 0)
         self.target_langs[target_lang] = current_count + 1
+        if current_count == 0:
+            # Sentences already translated into every other lang have been evicted from the queue
+            self._transcription_manager.requeue_recent_sentences(BACKLOG_SIZE)
         LOGGER.info(f'Subscribed to {target_lang}, current langs: {self.target_langs}')
 
     def unsubscribe_target_lang(self, target_lang: str):
         """Decrement count; remove target lang if count reaches zero."""
+        if target_lang == self._source_lang:
+            self._source_lang_subscribers = max(0, self._source_lang_subscribers - 1)
+            return
         if target_lang not in self.target_langs:
             return
 
@@ -45,46 +67,170 @@ class TranslationWorker(threading.Thread):
             del self.target_langs[target_lang]
         
         LOGGER.info(f'Unsubscribed from {target_lang}, current langs: {self.target_langs}')
+
+    def switch_source_lang(self, source_lang: str):
+        """Moves the subscriptions over to a new source lang, sockets that had it as target no longer need translations."""
+        previous_lang = self._source_lang
+        if source_lang == previous_lang:
+            return
+        self._source_lang = source_lang
+        previous_subscribers = self._source_lang_subscribers
+        self._source_lang_subscribers = self.target_langs.pop(source_lang, 0)
+        if previous_subscribers > 0:
+            self.target_langs[previous_lang] = previous_subscribers
+        LOGGER.info(f'Switched source lang from {previous_lang} to {source_lang}, current langs: {self.target_langs}')
     
+    def start(self):
+        """Starts the worker as a task on the running event loop."""
+        self._lang_semaphore = asyncio.Semaphore(self._max_parallel_langs)
+        self._task = asyncio.create_task(self.run())
+        if self.speculative:
+            self._preview_loop_task = asyncio.create_task(self._run_previews())
+
     def stop(self):
-        self._stop_event.set()
+        for task in (self._task, self._preview_loop_task, self._preview_task):
+            if task:
+                task.cancel()
+        self._task = self._preview_loop_task = self._preview_task = None
+        TRANSLATION_SERVICE.remove_room(self._transcription_manager.room_id)
+
+    def get_stats(self) -> dict:
+        return self._scheduler.get_stats()
+
+    async def _translate_entries(self, entries: list[dict], target_lang: str) -> list[dict]:
+        room_id = self._transcription_manager.room_id
+        source_lang = self._transcription_manager.source_lang
+        translations = [TRANSLATION_CACHE.get(source_lang, target_lang, entry['sentence']) for entry in entries]
+        missing = [idx for idx, translation in enumerate(translations) if translation is None]
+        sentences = [entries[idx]['sentence'] for idx in missing]
+
+        if sentences:
+            try:
+                # LibreTranslate accepts a list for `q`, so the whole batch is a single request
+                batch = await TRANSLATION_SERVICE.translate(room_id, sentences, source_lang, target_lang)
+                if not isinstance(batch, list) or len(batch) != len(sentences):
+                    raise TranslationError(f'Expected {len(sentences)} translations, got: {batch}')
+            except TranslationError as e:
+                # Fall back to single requests, so one bad sentence doesn't cost the whole batch
+                LOGGER.warning(f"Batch translation of {len(sentences)} sentences to '{target_lang}' failed, retrying one by one: {e}")
+                batch = []
+                for sentence in sentences:
+                    if TRANSLATION_SERVICE.get_capacity(room_id) == 0:
+                        # The backend is struggling already, the rest stays queued for the next cycle
+                        TRANSLATION_SERVICE.record_pushback(room_id, len(sentences) - len(batch))
+                        batch.extend([None] * (len(sentences) - len(batch)))
+                        break
+                    try:
+                        batch.append(await TRANSLATION_SERVICE.translate(room_id, sentence, source_lang, target_lang))
+                    except TranslationError as e:
+                        LOGGER.error(f"Translation error for '{sentence}' to '{target_lang}': {e}")
+                        batch.append(None)
+
+            for idx, sentence, translation in zip(missing, sentences, batch):
+                translations[idx] = translation
+                if translation is not None:
+                    TRANSLATION_CACHE.put(source_lang, target_lang, sentence, translation)
+
+        return [
+            {
+                'line_idx': entry['line_idx'],
+                'sent_idx': entry['sent_idx'],
+                'sentence': entry['sentence'],
+                'lang': target_lang,
+                'translation': translation
+            }
+            for entry, translation in zip(entries, translations)
+            if translation is not None
+        ]
+
+    async def _translate_lang(self, entries: list[dict], target_lang: str, cycle_start: float):
+        async with self._lang_semaphore:
+            translation_results = await self._translate_entries(entries, target_lang)
+
+        if translation_results:
+            # Submit right away instead of waiting for the other langs of this cycle
+            translation_time = time.time() - cycle_start
+            self._transcription_manager.submit_translation(translation_results, translation_time)
+            LOGGER.info(f"Submitted {len(translation_results)} translations to '{target_lang}' in {translation_time:.2f}s.")
 
-    def run(self):
-        while not self._stop_event.is_set():
+    async def _run_previews(self):
+        """Speculatively translates the incomplete sentence, so viewers of other langs don't wait for its punctuation."""
+        incomplete_sentence_event = self._transcription_manager.incomplete_sentence_event
+        last_text = ''
+        while True:
+            await incomplete_sentence_event.wait()
+            # Debounce, only the latest text after the window gets translated
+            await asyncio.sleep(self.speculative_debounce)
+            incomplete_sentence_event.clear()
+            text = self._transcription_manager.incomplete_sentence
+
+            in_flight = self._preview_task and not self._preview_task.done()
+            if in_flight and not text.startswith(last_text):
+                self._preview_task.cancel() # The text moved on, the result would be discarded anyway
+                in_flight = False
+            if not text or in_flight or _changed_chars(last_text, text) < self.speculative_min_change:
+                continue
+
+            last_text = text
+            self._preview_task = asyncio.create_task(self._translate_preview(text))
+
+    async def _translate_preview(self, text: str):
+        room_id = self._transcription_manager.room_id
+        source_lang = self._transcription_manager.source_lang
+        target_langs = list(self.target_langs)
+        if not target_langs or TRANSLATION_SERVICE.get_capacity(room_id) < len(target_langs):
+            return # Completed sentences take precedence over previews
+
+        # Previews bypass the translation cache, sentence fragments are rarely seen twice
+        results = await asyncio.gather(
+            *(TRANSLATION_SERVICE.translate(room_id, text, source_lang, target_lang) for target_lang in target_langs),
+            return_exceptions=True
+        )
+        translations = {
+            target_lang: result for target_lang, result in zip(target_langs, results) if isinstance(result, str)
+        }
+        if translations:
+            self._transcription_manager.submit_incomplete_sentence_translations(text, translations)
+
+    async def run(self):
+        pending_event = self._transcription_manager.pending_event
+        while True:
             cycle_start = time.time()
-            
+            # Cleared before polling, so sentences queued during this cycle wake the next one
+            pending_event.clear()
+
             # Check translation queue of transcription manager
             to_translate = self._transcription_manager.poll_sentences_to_translate(max_backlog=BACKLOG_SIZE)
 
-            for target_lang in self.target_langs.keys():
-                translation_results = []
-                for entry in to_translate:
-                    if target_lang in entry['translated_langs']:
-                        continue
-                    sentence = entry['sentence']
-                    try:
-                        translation = self.lt.translate(sentence, source=self._transcription_manager.source_lang, target=target_lang)
-                    except HTTPError as e:
-                        LOGGER.error(f"Translation error for '{sentence}' to '{target_lang}': {e}")
-                        continue
-                    translation_results.append({
-                        'line_idx': entry['line_idx'],
-                        'sent_idx': entry['sent_idx'],
-                        'sentence': sentence,
-                        'lang': target_lang,
-                        'translation': translation
-                    })
-                    
-                    if len(translation_results) >= self._max_batch_translations:
-                        # Protect against taking up too many resources with translation
-                        break
-                
-                if translation_results:
-                    translation_time = time.time() - cycle_start
-                    self._transcription_manager.submit_translation(translation_results, translation_time)
-                    LOGGER.info(f"Submitted {len(translation_results)} translations to '{target_lang}' in {translation_time:.2f}s.")
+            # Most important work first, batches are capped to protect against taking up too many resources
+            batches, stale = self._scheduler.schedule(to_translate, self.target_langs)
+            # Until the manager applied a source lang switch its queue still holds sentences in the previous source lang
+            batches = [(target_lang, entries) for target_lang, entries in batches if target_lang != self._transcription_manager.source_lang]
+            if stale:
+                LOGGER.info(f'Dropping {len(stale)} stale sentences from the translation queue')
+                self._transcription_manager.drop_pending_translations([(entry['line_idx'], entry['sent_idx']) for entry in stale])
+
+            # Back off while the room used up its share of the translation service, the rest stays queued
+            capacity = TRANSLATION_SERVICE.get_capacity(self._transcription_manager.room_id)
+            if len(batches) > capacity:
+                TRANSLATION_SERVICE.record_pushback(self._transcription_manager.room_id, len(batches) - capacity)
+                batches = batches[:capacity]
+
+            lang_tasks = [self._translate_lang(entries, target_lang, cycle_start) for target_lang, entries in batches]
+
+            # Langs are translated concurrently, capped by max_parallel_langs
+            await asyncio.gather(*lang_tasks)
 
+            # Also gives the transcription manager time to apply the submitted translations before the next poll
             elapsed = time.time() - cycle_start
-            sleep_time = self.poll_interval - elapsed
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            if elapsed < self.min_cycle_interval:
+                await asyncio.sleep(self.min_cycle_interval - elapsed)
+
+            try:
+                await asyncio.wait_for(pending_event.wait(), max(self.poll_interval - elapsed, 0))
+            except asyncio.TimeoutError:
+                pass # Poll anyway, e.g. to retry failed translations
+
+
+def _changed_chars(old_text: str, new_text: str) -> int:
+    return max(len(old_text), len(new_text)) - len(os.path.commonprefix([old_text, new_text]))
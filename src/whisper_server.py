@@ -1,42 +1,57 @@
-import subprocess
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, PlainTextResponse
 
-from io_config.config import ADMIN_PASSWORD, LT_HOST, LT_PORT, API_HOST, API_PORT
+from io_config.config import ADMIN_PASSWORD, LT_HOST, API_HOST, API_PORT, TRANSLATION_BACKEND_NAME, AVAILABLE_LT_LANGS, \
+    LT_RESTART_BACKOFF, LT_MAX_RESTART_BACKOFF
 from io_config.logger import LOGGER
 from room_system.room_manager import ROOM_MANAGER
+from room_system.worker_pool import WORKER_POOL
+from transcription_system.sentence_tokenizer import SENTENCE_TOKENIZER
 from transcription_system.transcript_formatter import get_available_transcript_list, compile_transcript_from_room_id
+from translation_system.translation_cache import TRANSLATION_CACHE
+from translation_system.libretranslate_supervisor import LibreTranslateSupervisor
+from translation_system.translation_client import get_replica_ports
+from translation_system.translation_service import TRANSLATION_SERVICE
 from auth_manager import auth_manager
 from vote_manager import VOTE_MANAGER, VoteManager
 
 server_ready = False
+libretranslate_supervisor: LibreTranslateSupervisor = None
 
 # --- FastAPI App and Lifespan ---
 @asynccontextmanager
 async def lifespan(app:FastAPI):
-    global server_ready
-    LOGGER.info(f"Starting LibreTranslate server: {LT_HOST}:{LT_PORT}")
-    # Start LibreTranslate as a subprocess
-    libretranslate_proc = subprocess.Popen(
-        [
-            "poetry", "run", "libretranslate",
-            "--host", LT_HOST,
-            "--port", str(LT_PORT),
-            # "--load-only", "en,de" # Only to be used for saving resources during debugging
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    LOGGER.info(f"LibreTranslate server started with PID {libretranslate_proc.pid}")
+    global server_ready, libretranslate_supervisor
+    if TRANSLATION_BACKEND_NAME == 'http':
+        # Every LibreTranslate replica runs as a supervised subprocess
+        libretranslate_supervisor = LibreTranslateSupervisor(
+            LT_HOST, get_replica_ports(), LT_RESTART_BACKOFF, LT_MAX_RESTART_BACKOFF,
+            on_exit=lambda port: TRANSLATION_SERVICE.mark_not_ready(f'LibreTranslate on port {port} exited')
+        )
+        libretranslate_supervisor.start()
+    await TRANSLATION_SERVICE.backend.start()
+    WORKER_POOL.start()
+
+    # Only ready once a real translation went through, loading the models takes a while
+    TRANSLATION_SERVICE.start_readiness_check(list(AVAILABLE_LT_LANGS))
+
+    TRANSLATION_CACHE.load()
+    TRANSLATION_CACHE.start()
 
     server_ready = True
     try:
         yield
     finally:
         server_ready = False
+        TRANSLATION_SERVICE.stop_readiness_check()
+        await TRANSLATION_SERVICE.backend.close()
+        await TRANSLATION_CACHE.close()
+        if libretranslate_supervisor:
+            await libretranslate_supervisor.stop()
+        await WORKER_POOL.stop()
 
 app = FastAPI(lifespan=lifespan)
 ngrok_url = "https://e0beeea7d617.ngrok-free.app"
@@ -50,11 +65,23 @@ app.add_middleware(
 
 @app.get("/backend/health")
 async def health():
-    if server_ready:
+    if server_ready and TRANSLATION_SERVICE.ready:
         return JSONResponse({"status": "ok"}, status_code=200)
     else:
         return JSONResponse({"status": "not ready"}, status_code=503)
 
+@app.get("/backend/stats")
+async def stats():
+    return JSONResponse({
+        'sentence_tokenizer': SENTENCE_TOKENIZER.get_stats(),
+        'translation_backend': TRANSLATION_SERVICE.backend.get_stats(),
+        'translation_cache': TRANSLATION_CACHE.get_stats(),
+        'translation_service': TRANSLATION_SERVICE.get_stats(),
+        'worker_pool': WORKER_POOL.get_stats(),
+        'libretranslate_processes': libretranslate_supervisor.get_stats() if libretranslate_supervisor else {},
+        'rooms': ROOM_MANAGER.get_stats()
+    })
+
 @app.post("/backend/login")
 async def auth(request: Request):
     body = await request.json()
@@ -170,6 +197,16 @@ async def connect_to_room(websocket: WebSocket, room_id: str, role: str, source_
         await websocket.close(code=1003, reason='No target lang found in url')
         return
 
+    # Opt-in delta protocol, clients may pass the last seq they recieved to resume after reconnecting
+    delta_protocol = websocket.query_params.get('protocol') == 'delta'
+    last_seq = websocket.query_params.get('last_seq')
+    session = websocket.query_params.get('session') # Session `last_seq` belongs to, seq numbers start over on server restarts
+    try:
+        last_seq = int(last_seq) if last_seq is not None else None
+    except ValueError:
+        await websocket.close(code=1003, reason='Invalid last_seq in url')
+        return
+
     if role == 'host':
         key = websocket.cookies.get('authenticated')  
         if ngrok_url == websocket.headers.get('origin'):
@@ -197,10 +234,11 @@ async def connect_to_room(websocket: WebSocket, room_id: str, role: str, source_
         await ROOM_MANAGER.activate_room_as_host(
             websocket, key, room_id,
             source_lang, target_lang,
-            save_transcript, public_transcript
+            save_transcript, public_transcript,
+            delta_protocol, last_seq, session
         )
     else:   # role == 'client'
-        await ROOM_MANAGER.join_room_as_client(websocket, room_id, target_lang)
+        await ROOM_MANAGER.join_room_as_client(websocket, room_id, target_lang, delta_protocol, last_seq, session)
 
 if __name__ == "__main__":
     import uvicorn